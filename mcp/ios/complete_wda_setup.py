@@ -5,11 +5,20 @@ Following project specifications for iOS device configuration workflow
 """
 
 import subprocess
+import shutil
 import time
 import sys
 from pathlib import Path
 import json
 
+# Inside an already-activated venv the console scripts and interpreter are
+# usable directly; `uv run` would only re-resolve the lockfile on every call.
+IN_VENV = sys.prefix != sys.base_prefix
+
+DERIVED_DATA_ROOT = Path.home() / "Library/Developer/Xcode/DerivedData"
+
+WDA_BUNDLE_ID = 'com.facebook.WebDriverAgentRunner.xctrunner'
+
 def print_status(message):
     print(f"✅ {message}")
 
@@ -22,6 +31,18 @@ def print_error(message):
 def print_info(message):
     print(f"ℹ️  {message}")
 
+def tool_command(tool, *args):
+    """Build a command for a venv console script, falling back to `uv run`."""
+    if IN_VENV and shutil.which(tool):
+        return [tool, *args]
+    return ['uv', 'run', tool, *args]
+
+def python_command(*args):
+    """Build a command for the project interpreter, falling back to `uv run`."""
+    if IN_VENV:
+        return [sys.executable, *args]
+    return ['uv', 'run', 'python', *args]
+
 def check_device_connection():
     """Check if iPhone is connected via USB."""
     print("🔍 Checking for connected iPhone...")
@@ -71,15 +92,16 @@ def check_webdriveragent_built():
     
     # Check if there are built products
     derived_data_paths = [
-        Path.home() / "Library/Developer/Xcode/DerivedData",
+        DERIVED_DATA_ROOT,
         wda_path / "DerivedData"
     ]
     
     for path in derived_data_paths:
         if path.exists():
-            wda_folders = list(path.glob("WebDriverAgent-*"))
-            if wda_folders:
-                return True, f"WebDriverAgent built at {wda_folders[0]}"
+            # Only the first match matters, so stop the glob early
+            wda_folder = next(path.glob("WebDriverAgent-*"), None)
+            if wda_folder:
+                return True, f"WebDriverAgent built at {wda_folder}"
     
     return False, "WebDriverAgent not built yet"
 
@@ -90,12 +112,12 @@ def start_webdriveragent_usb():
     try:
         # Method 1: Use tidevice
         print("📱 Starting WebDriverAgent with tidevice...")
-        cmd = ['uv', 'run', 'tidevice', 'wdaproxy', '-B', 'com.facebook.WebDriverAgentRunner.xctrunner']
         
         print("⏳ Starting WebDriverAgent proxy...")
         print("💡 Keep this terminal open while using iOS MCP!")
         print("")
         
+        cmd = tool_command('tidevice', 'wdaproxy', '-B', WDA_BUNDLE_ID)
         # Start the process in background but show output
         process = subprocess.Popen(cmd, cwd=Path(__file__).parent)
         
@@ -204,7 +226,7 @@ def test_ios_mcp_connection():
     
     try:
         # Test the connection
-        test_cmd = ['uv', 'run', 'python', '-c', '''
+        test_cmd = python_command('-c', '''
 import sys
 sys.path.append("src")
 from ios import IOSDevice
@@ -218,7 +240,7 @@ try:
 except Exception as e:
     print(f"❌ Connection failed: {e}")
     print("💡 Make sure WebDriverAgent is running on your iPhone")
-''']
+''')
         
         subprocess.run(test_cmd, cwd=Path(__file__).parent)
         
@@ -6,12 +6,22 @@ Finds your iPhone's IP address on the local network for WiFi connections.
 
 import subprocess
 import socket
+import ipaddress
+import time
 import requests
 import json
 import re
 from pathlib import Path
 import sys
 
+# Inside an already-activated venv the interpreter is usable directly;
+# `uv run` would only re-resolve the lockfile on every call.
+IN_VENV = sys.prefix != sys.base_prefix
+
+# nmap output is scanned as raw bytes to avoid decoding and lower()-ing each line
+NMAP_REPORT_RE = re.compile(rb'Nmap scan report for (\d+\.\d+\.\d+\.\d+)')
+APPLE_KEYWORD_RE = re.compile(rb'apple|iphone|ios', re.IGNORECASE)
+
 def print_status(message):
     print(f"✅ {message}")
 
@@ -24,6 +34,12 @@ def print_error(message):
 def print_info(message):
     print(f"ℹ️  {message}")
 
+def python_command(*args):
+    """Build a command for the project interpreter, falling back to `uv run`."""
+    if IN_VENV:
+        return [sys.executable, *args]
+    return ['uv', 'run', 'python', *args]
+
 def get_local_network_info():
     """Get local network information."""
     try:
@@ -34,13 +50,14 @@ def get_local_network_info():
         s.close()
         
         # Extract network range
-        ip_parts = local_ip.split('.')
-        network = f"{ip_parts[0]}.{ip_parts[1]}.{ip_parts[2]}.0/24"
+        iface = ipaddress.ip_interface(f"{local_ip}/24")
+        network = str(iface.network)
+        hosts = iface.network.hosts()
         
-        return local_ip, network
+        return local_ip, network, hosts
     except Exception as e:
         print_error(f"Failed to get network info: {e}")
-        return None, None
+        return None, None, None
 
 def scan_network_for_devices(network):
     """Scan network for iOS devices."""
@@ -50,23 +67,23 @@ def scan_network_for_devices(network):
         # Use nmap to scan for devices
         result = subprocess.run([
             'nmap', '-sn', network
-        ], capture_output=True, text=True, timeout=30)
+        ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=30)
         
         if result.returncode == 0:
             devices = []
-            lines = result.stdout.split('\n')
+            lines = result.stdout.split(b'\n')
             current_ip = None
             
             for line in lines:
                 # Look for IP addresses
-                ip_match = re.search(r'Nmap scan report for (\d+\.\d+\.\d+\.\d+)', line)
+                ip_match = NMAP_REPORT_RE.search(line)
                 if ip_match:
-                    current_ip = ip_match.group(1)
+                    current_ip = ip_match.group(1).decode('ascii')
                 
                 # Look for device info that might indicate iPhone
-                if current_ip and any(keyword in line.lower() for keyword in ['apple', 'iphone', 'ios']):
+                if current_ip and APPLE_KEYWORD_RE.search(line):
                     devices.append(current_ip)
-                elif current_ip and 'Host is up' in line:
+                elif current_ip and b'Host is up' in line:
                     # Add all responsive devices for manual checking
                     devices.append(current_ip)
             
@@ -128,7 +145,8 @@ def find_iphone_with_webdriveragent(devices):
 def get_arp_table_devices():
     """Get devices from ARP table (alternative method)."""
     try:
-        result = subprocess.run(['arp', '-a'], capture_output=True, text=True)
+        result = subprocess.run(['arp', '-a'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                encoding='utf-8', errors='replace')
         if result.returncode == 0:
             devices = []
             for line in result.stdout.split('\n'):
@@ -143,6 +161,21 @@ def get_arp_table_devices():
     except:
         return []
 
+def seed_arp_table(network):
+    """Send one UDP broadcast so devices on the subnet show up in the ARP table."""
+    try:
+        broadcast_ip = str(ipaddress.ip_network(network).broadcast_address)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            s.sendto(b'', (broadcast_ip, 1))
+        time.sleep(0.5)  # Give neighbours time to answer
+    except OSError:
+        pass
+
+def get_arp_devices_in_network(host_ids):
+    """Get ARP table devices whose integer address is in host_ids."""
+    return [ip for ip in get_arp_table_devices() if int(ipaddress.IPv4Address(ip)) in host_ids]
+
 def manual_ip_input():
     """Allow manual IP input if auto-detection fails."""
     print("\n📝 Manual IP Address Input")
@@ -171,8 +204,7 @@ def test_connection(ip, port=8100):
     
     try:
         # Test connection using our iOS MCP code
-        test_cmd = [
-            'uv', 'run', 'python', '-c', f'''
+        test_cmd = python_command('-c', f'''
 import sys
 sys.path.append("src")
 from ios import IOSDevice
@@ -187,8 +219,7 @@ try:
 except Exception as e:
     print(f"❌ Connection failed: {{e}}")
     print("💡 Make sure WebDriverAgent is running on your iPhone")
-'''
-        ]
+''')
         
         subprocess.run(test_cmd, cwd=Path(__file__).parent)
         
@@ -201,7 +232,7 @@ def main():
     print("This tool helps you find your iPhone's IP address for WiFi connections.\n")
     
     # Method 1: Get network info
-    local_ip, network = get_local_network_info()
+    local_ip, network, hosts = get_local_network_info()
     if local_ip:
         print_status(f"Your Mac's IP: {local_ip}")
         print_info(f"Scanning network: {network}")
@@ -209,21 +240,25 @@ def main():
         print_error("Could not determine network information")
         return
     
-    # Method 2: Scan network
-    print("\n🔍 Method 1: Network Scanning")
-    devices = scan_network_for_devices(network)
-    
+    # Method 2: ARP table (instant, usually already knows the iPhone)
+    print("\n🔍 Method 1: ARP Table")
+    host_ids = {int(addr) for addr in hosts}
+    devices = get_arp_devices_in_network(host_ids)
     if not devices:
-        print_warning("No devices found via network scan")
-        # Fallback to ARP table
-        print("\n🔍 Method 2: ARP Table")
-        devices = get_arp_table_devices()
+        seed_arp_table(network)
+        devices = get_arp_devices_in_network(host_ids)
+    
+    if devices:
+        print_status(f"Found {len(devices)} devices in ARP table")
+    else:
+        print_warning("No devices found in ARP table")
+        # Fallback to a full network scan
+        print("\n🔍 Method 2: Network Scanning")
+        devices = scan_network_for_devices(network)
         if devices:
-            print_status(f"Found {len(devices)} devices in ARP table")
+            print_status(f"Found {len(devices)} responsive devices")
         else:
-            print_warning("No devices found in ARP table")
-    else:
-        print_status(f"Found {len(devices)} responsive devices")
+            print_warning("No devices found via network scan")
     
     # Method 3: Check for WebDriverAgent
     iphones = []
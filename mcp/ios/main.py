@@ -7,14 +7,15 @@ Provides tools to interact directly with iOS devices, enabling automated testing
 app interaction, and device control similar to Android MCP.
 """
 
-from mcp.server.fastmcp import FastMCP, Image
-from contextlib import asynccontextmanager
+from mcp.server.fastmcp import FastMCP
+from contextlib import asynccontextmanager, redirect_stdout
 from argparse import ArgumentParser
 from src.ios import IOSDevice
 from textwrap import dedent
 import asyncio
+import logging
+import os
 import sys
-import traceback
 
 
 parser = ArgumentParser()
@@ -22,8 +23,17 @@ parser.add_argument('--device', type=str, help='Device UDID or IP address (e.g.,
 parser.add_argument('--simulator', action='store_true', help='Use iOS Simulator')
 parser.add_argument('--usb', action='store_true', help='Connect via USB using tidevice')
 parser.add_argument('--port', type=int, default=8100, help='WebDriverAgent port (default: 8100)')
+parser.add_argument('--mjpeg-port', type=int, help='WebDriverAgent MJPEG stream port for screenshots (e.g., 9100)')
+parser.add_argument('--screenshot-quality', type=int, default=1, choices=[0, 1, 2], help='WebDriverAgent screenshot quality: 0 = PNG, 1 = medium JPEG, 2 = low JPEG (default: 1)')
+parser.add_argument('--vision-scale', type=float, default=1.0, help='Scale for State-Tool screenshots, e.g. 0.5 draws and encodes a quarter of the pixels (default: 1.0)')
+parser.add_argument('--pause-stream-on-input', action='store_true', help='Pause the MJPEG stream during taps, swipes, scrolls and typing')
+parser.add_argument('--debug', action='store_true', help='Print full tracebacks on errors (or set IOS_MCP_DEBUG)')
 args = parser.parse_args()
 
+# Status output goes to stderr; LOG_LEVEL=WARNING silences the startup chatter
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'), format='%(message)s', stream=sys.stderr)
+_log = logging.getLogger('ios-mcp')
+
 instructions = dedent('''
 iOS MCP server provides tools to interact directly with iOS devices and simulators,
 enabling automated testing and device control similar to Android MCP.
@@ -32,96 +42,180 @@ Supports both physical devices and iOS Simulator through WebDriverAgent.
 IMPORTANT: Requires WebDriverAgent to be running on the target device.
 ''')
 
+# Tool result messages, filled in with str.format
+NOT_INITIALIZED_MSG = '❌ Device not initialized. Please restart the server.'
+CONNECTION_LOST_MSG = '❌ Connection lost during {}: {}. Please check device connection.'
+OPERATION_ERROR_MSG = '❌ Error during {}: {}'
+TAP_MSG = '✅ Successfully tapped on coordinates ({}, {})'
+TAP_FAILED_MSG = '❌ Failed to tap on coordinates ({}, {}): {}'
+LONG_PRESS_MSG = 'Long pressed on ({},{}) for {}s'
+SWIPE_MSG = 'Swiped from ({},{}) to ({},{})'
+TYPE_MSG = 'Typed "{}"'
+VOLUME_MSG = 'Pressed volume {}'
+WAIT_MSG = 'Waited for {} seconds'
+SET_ORIENTATION_MSG = 'Set orientation to {}'
+ORIENTATION_MSG = 'Current orientation: {}'
+SCROLL_MSG = 'Scrolled {} with distance {}'
+ELEMENT_WAIT_MSG = 'Element {} within {}s'
+BATCH_MSG = 'Executed {} actions:\n{}'
+
 @asynccontextmanager
 async def lifespan(app: FastMCP):
     """Runs initialization code before the server starts and cleanup code after it shuts down."""
-    await asyncio.sleep(1)  # Simulate startup latency
-    yield
+    # stdout carries the MCP protocol, so keep startup output on stderr
+    with redirect_stdout(sys.stderr):
+        ready = await initialize_device()
+    if not ready:
+        raise RuntimeError("Failed to initialize iOS device")
+    
+    try:
+        yield
+    finally:
+        if ios_device:
+            ios_device.close()
 
-mcp = FastMCP(name="iOS-MCP", instructions=instructions)
+mcp = FastMCP(name="iOS-MCP", instructions=instructions, lifespan=lifespan)
 
 # Global iOS device instance
 ios_device = None
 
-def initialize_device():
+# Bound device methods used by the tools, set by _bind_ops once the device is ready
+_TAP = _LONG_PRESS = _SWIPE = _TYPE = _TAP_ELEM = _TYPE_ELEM = None
+_HOME = _VOLUME = _LOCK = _UNLOCK = _APP_CONTROL = _WAIT = None
+_SET_ORIENTATION = _GET_ORIENTATION = _ALERT = _SCROLL = _WAIT_ELEM = None
+_TREE_TEXT = _STATE = _BATCH = None
+
+def _bind_ops():
+    """Bind device methods once so tool calls skip the attribute lookup."""
+    global _TAP, _LONG_PRESS, _SWIPE, _TYPE, _TAP_ELEM, _TYPE_ELEM
+    global _HOME, _VOLUME, _LOCK, _UNLOCK, _APP_CONTROL, _WAIT
+    global _SET_ORIENTATION, _GET_ORIENTATION, _ALERT, _SCROLL, _WAIT_ELEM
+    global _TREE_TEXT, _STATE, _BATCH
+    _TAP = ios_device.tap
+    _LONG_PRESS = ios_device.long_press
+    _SWIPE = ios_device.swipe
+    _TYPE = ios_device.type_text
+    _TAP_ELEM = ios_device.tap_element
+    _TYPE_ELEM = ios_device.type_in_element
+    _HOME = ios_device.home
+    _VOLUME = ios_device.volume
+    _LOCK = ios_device.lock
+    _UNLOCK = ios_device.unlock
+    _APP_CONTROL = ios_device.app_control
+    _WAIT = ios_device.wait
+    _SET_ORIENTATION = ios_device.set_orientation
+    _GET_ORIENTATION = ios_device.get_orientation
+    _ALERT = ios_device.handle_alert
+    _SCROLL = ios_device.scroll
+    _WAIT_ELEM = ios_device.wait_for_element
+    _TREE_TEXT = ios_device.get_tree_text
+    _STATE = ios_device.get_state
+    _BATCH = ios_device.batch_actions
+
+def warm_up_screenshot():
+    """Take a throwaway screenshot so the first vision call doesn't pay setup costs."""
+    try:
+        ios_device.get_screenshot()
+    except Exception:
+        pass
+
+async def initialize_device():
     """Initialize iOS device with proper error handling."""
     global ios_device
     
     try:
-        print("🚀 Initializing iOS MCP Server...")
-        print(f"🔌 Connection mode: {'USB' if args.usb else 'Network'}")
+        _log.info("🚀 Initializing iOS MCP Server...")
+        _log.info(f"🔌 Connection mode: {'USB' if args.usb else 'Network'}")
         if args.device:
-            print(f"🎯 Target device: {args.device}")
+            _log.info(f"🎯 Target device: {args.device}")
         elif args.simulator:
-            print("📱 Target: iOS Simulator")
+            _log.info("📱 Target: iOS Simulator")
         else:
-            print("📱 Target: Auto-detect device")
+            _log.info("📱 Target: Auto-detect device")
         
-        ios_device = IOSDevice(
+        ios_device = await asyncio.to_thread(
+            IOSDevice,
             device=args.device,
             simulator=args.simulator,
             usb=args.usb,
             port=args.port,
-            auto_setup=True
+            auto_setup=True,
+            mjpeg_port=args.mjpeg_port,
+            screenshot_quality=args.screenshot_quality,
+            pause_stream_on_input=args.pause_stream_on_input
         )
         
-        # Print device info
-        device_info = ios_device.get_device_info()
+        # Both calls only wait on WebDriverAgent, so overlap them
+        device_info, _ = await asyncio.gather(
+            asyncio.to_thread(ios_device.get_device_info),
+            asyncio.to_thread(warm_up_screenshot)
+        )
         if device_info.get('connected'):
-            print("✅ iOS MCP Server ready!")
+            safe_device_operation.__kwdefaults__ = {'_device': ios_device}
+            _bind_ops()
+            _log.info("✅ iOS MCP Server ready!")
             return True
         else:
-            print("❌ Device initialization failed")
+            _log.error("❌ Device initialization failed")
             return False
             
     except ConnectionError as e:
-        print(f"❌ Connection Error: {e}")
-        print("\n💡 Quick fixes to try:")
-        print("1. Ensure your iOS device/simulator is connected")
-        print("2. Check that WebDriverAgent is installed and running")
-        print("3. Verify device is trusted and unlocked")
-        print("4. See README.md for detailed setup instructions")
+        _log.error(f"❌ Connection Error: {e}")
+        _log.error("\n💡 Quick fixes to try:")
+        _log.error("1. Ensure your iOS device/simulator is connected")
+        _log.error("2. Check that WebDriverAgent is installed and running")
+        _log.error("3. Verify device is trusted and unlocked")
+        _log.error("4. See README.md for detailed setup instructions")
         return False
         
     except Exception as e:
-        print(f"❌ Unexpected error during initialization: {e}")
-        print("\nFull traceback:")
-        traceback.print_exc()
+        _log.error(f"❌ Unexpected error during initialization: {e!r}")
+        if args.debug or os.getenv('IOS_MCP_DEBUG'):
+            import traceback
+            _log.error("\nFull traceback:")
+            traceback.print_exc()
         return False
 
-def safe_device_operation(operation_name: str, operation_func, *args, **kwargs):
+def safe_device_operation(operation_name: str, operation_func, *args, _device=None, **kwargs):
     """Safely execute device operations with error handling."""
     try:
-        if not ios_device:
-            return f"❌ Device not initialized. Please restart the server."
+        # _device is bound once the device is ready, so this is a local check
+        if _device is None:
+            return NOT_INITIALIZED_MSG
         
         return operation_func(*args, **kwargs)
         
     except ConnectionError as e:
-        return f"❌ Connection lost during {operation_name}: {e}. Please check device connection."
+        return CONNECTION_LOST_MSG.format(operation_name, e)
     except Exception as e:
-        return f"❌ Error during {operation_name}: {e}"
+        return OPERATION_ERROR_MSG.format(operation_name, e)
 
 @mcp.tool(name='Click-Tool', description='Tap on specific coordinates')
 def click_tool(x: int, y: int):
     """Tap on specific coordinates on the iOS device screen."""
     def perform_tap():
         try:
-            ios_device.tap(x, y)
-            return f'✅ Successfully tapped on coordinates ({x}, {y})'
+            _TAP(x, y)
+            return TAP_MSG.format(x, y)
         except Exception as e:
-            return f'❌ Failed to tap on coordinates ({x}, {y}): {str(e)}'
+            return TAP_FAILED_MSG.format(x, y, e)
     
     return safe_device_operation("tap", perform_tap)
 
-@mcp.tool('State-Tool', description='Get the state of the iOS device. Optionally includes visual screenshot when use_vision=True.')
-def state_tool(use_vision: bool = False):
+@mcp.tool('State-Tool', description='Get the state of the iOS device. Optionally includes visual screenshot when use_vision=True. Set use_ui_tree=False with use_vision=True for a fast screenshot-only state that skips the UI tree.')
+def state_tool(use_vision: bool = False, use_ui_tree: bool = True):
     """Get the current state of the iOS device with optional screenshot."""
+    if not use_vision and not use_ui_tree:
+        return '❌ Nothing to return: enable use_vision and/or use_ui_tree'
+    
     def get_state():
-        device_state = ios_device.get_state(use_vision=use_vision)
-        result = [device_state.tree_state.to_string()]
+        if not use_vision:
+            return [_TREE_TEXT()]
+        device_state = _STATE(use_vision=use_vision, use_ui_tree=use_ui_tree, vision_scale=args.vision_scale)
+        result = [device_state.tree_state.to_string()] if use_ui_tree else []
         if use_vision and device_state.screenshot:
-            result.append(Image(data=device_state.screenshot, format='PNG'))
+            from mcp.server.fastmcp import Image  # Only needed for vision results
+            result.append(Image(data=device_state.screenshot, format=device_state.screenshot_format.lower()))
         return result
     
     return safe_device_operation("get_state", get_state)
@@ -129,22 +223,23 @@ def state_tool(use_vision: bool = False):
 @mcp.tool(name='Long-Press-Tool', description='Long press on specific coordinates')
 def long_press_tool(x: int, y: int, duration: float = 1.0):
     """Long press on specific coordinates for given duration."""
-    return safe_device_operation(
-        "long_press",
-        lambda: (ios_device.long_press(x, y, duration=duration), f'Long pressed on ({x},{y}) for {duration}s')[1]
-    )
+    def perform_long_press():
+        _LONG_PRESS(x, y, duration=duration)
+        return LONG_PRESS_MSG.format(x, y, duration)
+    
+    return safe_device_operation("long_press", perform_long_press)
 
 @mcp.tool(name='Swipe-Tool', description='Swipe between coordinates')
 def swipe_tool(x1: int, y1: int, x2: int, y2: int, duration: float = 0.5):
     """Swipe from one coordinate to another."""
-    ios_device.swipe(x1, y1, x2, y2, duration=duration)
-    return f'Swiped from ({x1},{y1}) to ({x2},{y2})'
+    _SWIPE(x1, y1, x2, y2, duration=duration)
+    return SWIPE_MSG.format(x1, y1, x2, y2)
 
 @mcp.tool(name='Type-Tool', description='Type text on the device')
 def type_tool(text: str, clear: bool = False):
     """Type text on the iOS device. Optionally clear existing text first."""
-    ios_device.type_text(text, clear=clear)
-    return f'Typed "{text}"'
+    _TYPE(text, clear=clear)
+    return TYPE_MSG.format(text)
 
 @mcp.tool(name='Element-Tap-Tool', description='Tap on element by various selectors')
 def element_tap_tool(selector: str, value: str, timeout: float = 10.0):
@@ -152,7 +247,7 @@ def element_tap_tool(selector: str, value: str, timeout: float = 10.0):
     Tap on element using various selectors.
     Selector types: id, name, label, className, xpath, predicate
     """
-    result = ios_device.tap_element(selector, value, timeout=timeout)
+    result = _TAP_ELEM(selector, value, timeout=timeout)
     return result
 
 @mcp.tool(name='Element-Type-Tool', description='Type text in element by various selectors')
@@ -161,13 +256,13 @@ def element_type_tool(selector: str, value: str, text: str, clear: bool = True,
     Type text in element using various selectors.
     Selector types: id, name, label, className, xpath, predicate
     """
-    result = ios_device.type_in_element(selector, value, text, clear=clear, timeout=timeout)
+    result = _TYPE_ELEM(selector, value, text, clear=clear, timeout=timeout)
     return result
 
 @mcp.tool(name='Home-Tool', description='Press home button')
 def home_tool():
     """Press the home button to return to home screen."""
-    ios_device.home()
+    _HOME()
     return 'Pressed home button'
 
 @mcp.tool(name='Volume-Tool', description='Press volume buttons')
@@ -176,8 +271,8 @@ def volume_tool(direction: str):
     Press volume buttons.
     Direction: up, down
     """
-    ios_device.volume(direction)
-    return f'Pressed volume {direction}'
+    _VOLUME(direction)
+    return VOLUME_MSG.format(direction)
 
 @mcp.tool(name='Lock-Tool', description='Lock or unlock the device')
 def lock_tool(action: str):
@@ -186,10 +281,10 @@ def lock_tool(action: str):
     Action: lock, unlock
     """
     if action == 'lock':
-        ios_device.lock()
+        _LOCK()
         return 'Device locked'
     elif action == 'unlock':
-        ios_device.unlock()
+        _UNLOCK()
         return 'Device unlocked'
     else:
         return 'Invalid action. Use "lock" or "unlock"'
@@ -200,14 +295,14 @@ def app_control_tool(action: str, bundle_id: str):
     Control app lifecycle.
     Actions: launch, terminate, activate, state
     """
-    result = ios_device.app_control(action, bundle_id)
+    result = _APP_CONTROL(action, bundle_id)
     return result
 
 @mcp.tool(name='Wait-Tool', description='Wait for specified duration')
 def wait_tool(duration: float):
     """Wait for specified duration in seconds."""
-    ios_device.wait(duration)
-    return f'Waited for {duration} seconds'
+    _WAIT(duration)
+    return WAIT_MSG.format(duration)
 
 @mcp.tool(name='Orientation-Tool', description='Get or set device orientation')
 def orientation_tool(orientation: str = None):
@@ -216,11 +311,11 @@ def orientation_tool(orientation: str = None):
     Orientations: portrait, landscape, landscape_left, landscape_right
     """
     if orientation:
-        ios_device.set_orientation(orientation)
-        return f'Set orientation to {orientation}'
+        _SET_ORIENTATION(orientation)
+        return SET_ORIENTATION_MSG.format(orientation)
     else:
-        current = ios_device.get_orientation()
-        return f'Current orientation: {current}'
+        current = _GET_ORIENTATION()
+        return ORIENTATION_MSG.format(current)
 
 @mcp.tool(name='Alert-Tool', description='Handle iOS alerts/dialogs')
 def alert_tool(action: str, text: str = None):
@@ -228,7 +323,7 @@ def alert_tool(action: str, text: str = None):
     Handle iOS alerts and dialogs.
     Actions: accept, dismiss, get_text, type_text
     """
-    result = ios_device.handle_alert(action, text)
+    result = _ALERT(action, text)
     return result
 
 @mcp.tool(name='Scroll-Tool', description='Scroll in specified direction')
@@ -238,8 +333,8 @@ def scroll_tool(direction: str, distance: float = 0.5):
     Directions: up, down, left, right
     Distance: 0.1 to 1.0 (percentage of screen)
     """
-    ios_device.scroll(direction, distance)
-    return f'Scrolled {direction} with distance {distance}'
+    _SCROLL(direction, distance)
+    return SCROLL_MSG.format(direction, distance)
 
 @mcp.tool(name='Element-Wait-Tool', description='Wait for element to appear')
 def element_wait_tool(selector: str, value: str, timeout: float = 10.0):
@@ -247,14 +342,26 @@ def element_wait_tool(selector: str, value: str, timeout: float = 10.0):
     Wait for element to appear using various selectors.
     Returns True if element appears, False if timeout.
     """
-    result = ios_device.wait_for_element(selector, value, timeout=timeout)
-    return f'Element {"found" if result else "not found"} within {timeout}s'
+    result = _WAIT_ELEM(selector, value, timeout=timeout)
+    return ELEMENT_WAIT_MSG.format('found' if result else 'not found', timeout)
 
-if __name__ == '__main__':
-    # Initialize device before starting server
-    if not initialize_device():
-        print("\n❌ Failed to initialize iOS device. Exiting...")
-        sys.exit(1)
+@mcp.tool(name='Batch-Actions-Tool', description='Run a sequence of actions in one call. Contiguous tap, long_press, swipe and wait steps are sent to the device as a single request.')
+def batch_actions_tool(actions: list[dict], validate_after: bool = False):
+    """
+    Run a sequence of actions in one call.
+    Each action is {"action": name, "args": {...}}.
+    Actions: tap, long_press, swipe, wait, type, home, volume, scroll, orientation, alert, app_control, tap_element
+    """
+    def run_batch():
+        results = _BATCH(actions)
+        summary = BATCH_MSG.format(len(results), '\n'.join(results))
+        if validate_after:
+            return [summary, _STATE().tree_state.to_string()]
+        return summary
     
-    print("\n🎯 Starting MCP server...")
+    return safe_device_operation("batch_actions", run_batch)
+
+if __name__ == '__main__':
+    # The device is initialized in lifespan, before the server accepts requests
+    _log.info("\n🎯 Starting MCP server...")
     mcp.run()
\ No newline at end of file
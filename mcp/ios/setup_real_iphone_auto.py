@@ -4,10 +4,14 @@ Automated Real iPhone Setup for iOS MCP Server
 This script automates WebDriverAgent setup on real iPhone devices.
 """
 
+import atexit
 import subprocess
 import time
 import sys
+import requests
 from pathlib import Path
+from complete_wda_setup import tool_command
+from tidevice_pipe import get_pipe
 
 def print_status(message):
     print(f"✅ {message}")
@@ -21,23 +25,56 @@ def print_error(message):
 def print_info(message):
     print(f"ℹ️  {message}")
 
+WDA_STATUS_URL = 'http://127.0.0.1:8100/status'
+
+def wait_for_webdriveragent(process, timeout=15):
+    """Poll WebDriverAgent /status with backoff until it reports ready."""
+    deadline = time.monotonic() + timeout
+    delay = 0.1
+    while time.monotonic() < deadline:
+        # Bail out early if the proxy process crashed
+        if process.poll() is not None:
+            return False
+        try:
+            if requests.get(WDA_STATUS_URL, timeout=1).json()['value']['ready']:
+                return True
+        except Exception:
+            pass
+        time.sleep(delay)
+        delay = min(delay * 2, 3.2)
+    return False
+
+def stop_process(process):
+    """Terminate a helper process if it is still running."""
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def start_mjpeg_relay():
+    """Relay the MJPEG stream port over USB until this script exits."""
+    relay = subprocess.Popen(tool_command('tidevice', 'relay', '9100', '9100'),
+                             cwd=Path(__file__).parent,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    atexit.register(stop_process, relay)
+    return relay
+
 def check_device_connection():
     """Check if iPhone is connected and trusted."""
     print("🔍 Checking for connected iPhone...")
     
     try:
         # Use tidevice to check for devices
-        result = subprocess.run(['uv', 'run', 'python', '-c', 
-                               'import tidevice; print("\\n".join([str(d) for d in tidevice.Device.list()]))'],
-                               capture_output=True, text=True, cwd=Path(__file__).parent)
-        
-        devices = result.stdout.strip()
+        pipe = get_pipe()
+        devices = pipe.call('list')
         if devices:
             print_status("iPhone connected:")
-            for device in devices.split('\n'):
-                if device.strip():
-                    print(f"   📱 {device}")
-            return devices.split('\n')[0].strip()  # Return first device
+            for udid in devices:
+                info = pipe.call('info', udid=udid)
+                print(f"   📱 {info.get('DeviceName', 'iPhone')} ({udid})")
+            return devices[0]  # Return first device
         else:
             print_error("No iPhone detected")
             print_info("Please:")
@@ -59,12 +96,13 @@ def start_webdriveragent(device_id=None):
     try:
         # Build the tidevice command
         cmd = ['uv', 'run', 'python', '-c', '''
+import sys
 import tidevice
 import time
 
 print("📱 Starting WebDriverAgent...")
 try:
-    device = tidevice.Device()
+    device = tidevice.Device(sys.argv[1] if len(sys.argv) > 1 else None)
     print("🔧 Installing WebDriverAgent if needed...")
     
     # Start WebDriverAgent proxy
@@ -75,6 +113,8 @@ except Exception as e:
     print(f"❌ Error: {e}")
     print("💡 Try manual setup if this fails")
 ''']
+        if device_id:
+            cmd.append(device_id)
         
         print("⏳ This may take a few moments...")
         print("📱 Check your iPhone - you may need to trust the app")
@@ -82,20 +122,24 @@ except Exception as e:
         # Start the process
         process = subprocess.Popen(cmd, cwd=Path(__file__).parent)
         
-        # Give it some time to start
-        time.sleep(5)
+        # Relay the MJPEG stream on its own port so screenshots don't share
+        # the WebDriverAgent action connection
+        relay = start_mjpeg_relay()
         
-        # Check if it's running
-        if process.poll() is None:
-            print_status("WebDriverAgent process started!")
+        # Wait until WebDriverAgent answers instead of a fixed delay
+        if wait_for_webdriveragent(process):
+            print_status("WebDriverAgent is ready!")
             print_info("WebDriverAgent should be running on your iPhone")
             print_info("You can now connect using:")
             print("   uv run main.py --usb")
+            print("   or, with `uv run tidevice relay 9100 9100` running in another terminal:")
+            print("   uv run main.py --usb --mjpeg-port 9100")
             print("   or")
             print("   uv run main.py --device IPHONE_IP:8100")
             return True
         else:
-            print_warning("WebDriverAgent process may have failed")
+            print_warning("WebDriverAgent did not become ready")
+            stop_process(relay)
             return False
             
     except Exception as e:
@@ -105,29 +149,15 @@ except Exception as e:
 def test_connection():
     """Test iOS MCP connection to real iPhone."""
     print("\n🧪 Testing iOS MCP connection...")
+    print("Testing USB connection...")
     
     try:
-        # Test USB connection
-        test_cmd = ['uv', 'run', 'python', '-c', '''
-import sys
-sys.path.append("src")
-from ios import IOSDevice
-
-print("Testing USB connection...")
-try:
-    device = IOSDevice(usb=True, auto_setup=False)
-    info = device.get_device_info()
-    print(f"✅ Connection successful!")
-    print(f"📊 Device info: {info}")
-except Exception as e:
-    print(f"❌ Connection failed: {e}")
-    print("💡 Make sure WebDriverAgent is running on your iPhone")
-''']
-        
-        subprocess.run(test_cmd, cwd=Path(__file__).parent)
-        
+        info = get_pipe().call('test_connection', usb=True)
+        print(f"✅ Connection successful!")
+        print(f"📊 Device info: {info}")
     except Exception as e:
-        print_error(f"Test failed: {e}")
+        print(f"❌ Connection failed: {e}")
+        print("💡 Make sure WebDriverAgent is running on your iPhone")
 
 def main():
     print("📱 Automated Real iPhone Setup")
@@ -5,9 +5,22 @@ This script helps you set up WiFi debugging for your iPhone with tidevice
 """
 
 import subprocess
+import re
+import threading
 import time
 import sys
 from pathlib import Path
+from tidevice_pipe import get_pipe
+
+# One `tidevice list` row; anchored on the UDID so the header never matches
+TIDEVICE_ROW_RE = re.compile(
+    r'^(?P<udid>[0-9a-f\-]{25,})\s+(?P<serial>\S+)\s+(?P<name>.+?)\s+'
+    r'(?P<version>\d+\.\d+(?:\.\d+)?)\s+(?P<conn_type>USB|WiFi)',
+    re.MULTILINE | re.IGNORECASE
+)
+
+# Bonjour services advertised by iPhones with wireless debugging enabled
+MDNS_SERVICE_TYPES = ['_apple-mobdev2._tcp.local.', '_remotepairing._tcp.local.']
 
 def print_status(message):
     print(f"✅ {message}")
@@ -26,24 +39,8 @@ def check_usb_devices():
     print("🔍 Checking for USB connected iPhone...")
     
     try:
-        result = subprocess.run(['uv', 'run', 'tidevice', 'list'], 
-                               capture_output=True, text=True, cwd=Path(__file__).parent)
-        
-        lines = result.stdout.strip().split('\n')
-        devices = []
-        
-        for line in lines[1:]:  # Skip header
-            if line.strip() and 'UDID' not in line:
-                parts = line.split()
-                if len(parts) >= 4:
-                    devices.append({
-                        'udid': parts[0],
-                        'name': parts[2] if len(parts) > 2 else 'Unknown',
-                        'version': parts[4] if len(parts) > 4 else 'Unknown',
-                        'conn_type': parts[5] if len(parts) > 5 else 'USB'
-                    })
-        
-        return devices
+        result = get_pipe().call('run', args=['list'])
+        return [match.groupdict() for match in TIDEVICE_ROW_RE.finditer(result['stdout'])]
         
     except Exception as e:
         print_error(f"Error checking devices: {e}")
@@ -55,22 +52,51 @@ def enable_wifi_debugging(device_udid):
     
     try:
         # Try to enable wireless debugging using tidevice
-        result = subprocess.run(['uv', 'run', 'tidevice', '-u', device_udid, 'pair'], 
-                               capture_output=True, text=True, cwd=Path(__file__).parent)
+        result = get_pipe().call('run', args=['-u', device_udid, 'pair'])
         
-        if result.returncode == 0:
+        if result['returncode'] == 0:
             print_status("WiFi debugging pairing initiated")
             return True
         else:
             print_warning("Pairing command completed with warnings")
-            print("Output:", result.stdout)
-            print("Errors:", result.stderr)
+            print("Output:", result['stdout'])
+            print("Errors:", result['stderr'])
             return True  # Continue anyway
             
     except Exception as e:
         print_error(f"Error enabling WiFi debugging: {e}")
         return False
 
+def discover_device_ip(timeout=2.0):
+    """Find the iPhone's IP address from its Bonjour advertisement."""
+    from zeroconf import IPVersion, ServiceBrowser, ServiceListener, Zeroconf
+    
+    found = []
+    event = threading.Event()
+    
+    class DeviceListener(ServiceListener):
+        def add_service(self, zc, type_, name):
+            info = zc.get_service_info(type_, name, timeout=1000)
+            addresses = info.parsed_addresses(IPVersion.V4Only) if info else []
+            if addresses:
+                found.append(addresses[0])
+                event.set()
+        
+        def update_service(self, zc, type_, name):
+            pass
+        
+        def remove_service(self, zc, type_, name):
+            pass
+    
+    zeroconf = Zeroconf()
+    try:
+        ServiceBrowser(zeroconf, MDNS_SERVICE_TYPES, DeviceListener())
+        event.wait(timeout)
+    finally:
+        zeroconf.close()
+    
+    return found[0] if found else None
+
 def get_device_ip():
     """Help user find their iPhone's IP address."""
     print("\n📱 Finding Your iPhone's IP Address")
@@ -83,25 +109,28 @@ def get_device_ip():
     print("4. Look for 'IP Address'")
     print("")
     
-    print("Method 2: Use Network Scanner")
-    print("We can scan your network for the iPhone...")
+    print("Method 2: Bonjour Lookup")
+    print("We can look up the iPhone on your network...")
     
     try:
-        # Use our existing IP finder
-        print("🔍 Scanning network for iPhone...")
-        result = subprocess.run(['python3', 'find_iphone_ip.py'], 
-                               capture_output=True, text=True, cwd=Path(__file__).parent)
-        
+        print("🔍 Looking for iPhone via Bonjour...")
+        ip = discover_device_ip()
+        if ip:
+            print_status(f"Found iPhone at {ip}")
+            return ip
+        print_warning("No iPhone answered the Bonjour lookup")
+    except ImportError:
+        # zeroconf isn't installed; fall back to the subnet scanner
+        print_warning("zeroconf not installed, scanning the network instead...")
+        result = subprocess.run([sys.executable, 'find_iphone_ip.py'],
+                                capture_output=True, text=True, cwd=Path(__file__).parent)
         if result.returncode == 0:
             print("Scan results:")
             print(result.stdout)
         else:
             print_warning("Network scan not available")
-            
-    except FileNotFoundError:
-        print_warning("Network scanner not found")
     except Exception as e:
-        print_warning(f"Network scan failed: {e}")
+        print_warning(f"Bonjour lookup failed: {e}")
     
     # Ask user for IP
     print("\n📝 Enter Your iPhone's IP Address:")
@@ -119,21 +148,19 @@ def test_wifi_connection(device_ip):
     
     try:
         # First, try to detect the device
-        result = subprocess.run(['uv', 'run', 'tidevice', '-u', device_ip, 'info'], 
-                               capture_output=True, text=True, timeout=10,
-                               cwd=Path(__file__).parent)
+        result = get_pipe().call('run', timeout=10, args=['-u', device_ip, 'info'])
         
-        if result.returncode == 0:
+        if result['returncode'] == 0:
             print_status(f"WiFi connection to {device_ip} successful!")
             print("Device info:")
-            print(result.stdout)
+            print(result['stdout'])
             return True
         else:
             print_error("WiFi connection failed")
-            print("Error:", result.stderr)
+            print("Error:", result['stderr'])
             return False
             
-    except subprocess.TimeoutExpired:
+    except TimeoutError:
         print_error("Connection timeout - device not reachable via WiFi")
         return False
     except Exception as e:
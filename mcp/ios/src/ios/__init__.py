@@ -5,17 +5,124 @@ Handles iOS device connections, automation operations, and state management
 using WebDriverAgent and tidevice for iOS automation.
 """
 
+import base64
+import logging
+import random
 import time
+import weakref
 import wda
-import tidevice
 import requests
+from requests.adapters import HTTPAdapter
 import subprocess
-import socket
-from typing import Optional, Union, Dict, Any, Tuple, List
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Optional, Dict, Any, Tuple, List
 from io import BytesIO
-from PIL import Image
+from urllib.parse import urlsplit
 from src.ios.views import IOSState
-from src.tree import IOSTree
+from src.tree import IOSTree, TreeState
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds tree text is reused when no action has run; bounds staleness from
+# UI changes no tool caused (async loads, alerts, timers)
+TREE_TEXT_CACHE_TTL = 1.0
+# MJPEG stream settings applied when a stream port is configured
+MJPEG_SCREENSHOT_QUALITY = 50
+MJPEG_FRAMERATE = 10
+# WDA treats framerates outside 1..60 as the maximum, so 1 is the closest to paused
+MJPEG_PAUSED_FRAMERATE = 1
+# Seconds a WDA /status response is reused by get_device_info
+STATUS_CACHE_TTL = 1.0
+# Seconds a cached tree snapshot may be reused when no action has run since
+TREE_STATE_TTL = 0.3
+# Deep page source snapshots can hang the XCTest daemon
+SNAPSHOT_MAX_DEPTH = 50
+# Long edge, in pixels, annotated vision screenshots are shrunk to before encoding
+VISION_MAX_EDGE = 1024
+
+# Direction and orientation names -> wda session methods, keys and values
+_SCROLL_METHODS = {
+    'up': 'swipe_up',
+    'down': 'swipe_down',
+    'left': 'swipe_left',
+    'right': 'swipe_right',
+}
+_VOLUME_KEYS = {'up': 'volumeUp', 'down': 'volumeDown'}
+_ORIENTATIONS = {
+    'portrait': wda.PORTRAIT,
+    'landscape': wda.LANDSCAPE,
+    # facebook-wda has no LANDSCAPE_LEFT; WDA's 'LANDSCAPE' is landscape left
+    'landscape_left': wda.LANDSCAPE,
+    'landscape_right': wda.LANDSCAPE_RIGHT,
+}
+
+# App state names indexed by WDA's XCUIApplicationState value
+_APP_STATES = ('unknown', 'not_installed', 'background', 'background', 'running')
+
+# NSPredicate lookups skip the full XML snapshot that XPath queries need
+FOCUSED_ELEMENT_PREDICATE = 'hasKeyboardFocus == 1'
+# Backspaces sent to clear a field when the focused element can't be found
+BLIND_CLEAR_BACKSPACES = 50
+
+# Element selector type -> wda session query keyword
+_SELECTOR_KWARGS = {
+    'id': 'id',
+    'name': 'name',
+    'label': 'label',
+    'className': 'className',
+    'xpath': 'xpath',
+    'predicate': 'predicate',
+}
+
+
+def _tap_events(x: int, y: int, hold: float = 0.0) -> List[Dict[str, Any]]:
+    """W3C pointer events for a tap, or a long press when hold > 0."""
+    events = [
+        {'type': 'pointerMove', 'duration': 0, 'x': x, 'y': y},
+        {'type': 'pointerDown', 'button': 0},
+    ]
+    if hold > 0:
+        events.append({'type': 'pause', 'duration': int(hold * 1000)})
+    events.append({'type': 'pointerUp', 'button': 0})
+    return events
+
+
+def _swipe_events(x1: int, y1: int, x2: int, y2: int, duration: float = 0.5) -> List[Dict[str, Any]]:
+    """W3C pointer events for a swipe."""
+    return [
+        {'type': 'pointerMove', 'duration': 0, 'x': x1, 'y': y1},
+        {'type': 'pointerDown', 'button': 0},
+        {'type': 'pointerMove', 'duration': int(duration * 1000), 'x': x2, 'y': y2},
+        {'type': 'pointerUp', 'button': 0},
+    ]
+
+
+def _pause_events(duration: float) -> List[Dict[str, Any]]:
+    """W3C pointer events for a wait."""
+    return [{'type': 'pause', 'duration': int(duration * 1000)}]
+
+
+def _image_format(data: bytes) -> Optional[str]:
+    """Image format of encoded bytes, read from their magic number."""
+    if data.startswith(b'\x89PNG'):
+        return 'PNG'
+    if data.startswith(b'\xff\xd8'):
+        return 'JPEG'
+    return None
+
+
+# Batch steps that can be expressed as W3C pointer events
+_POINTER_STEPS = {
+    'tap': lambda args: _tap_events(args['x'], args['y']),
+    'long_press': lambda args: _tap_events(args['x'], args['y'], args.get('duration', 1.0)),
+    'swipe': lambda args: _swipe_events(args['x1'], args['y1'], args['x2'], args['y2'], args.get('duration', 0.5)),
+    'wait': lambda args: _pause_events(args['duration']),
+}
 
 
 class IOSDevice:
@@ -27,7 +134,14 @@ class IOSDevice:
         simulator: bool = False,
         usb: bool = False,
         port: int = 8100,
-        auto_setup: bool = True
+        auto_setup: bool = True,
+        mjpeg_port: Optional[int] = None,
+        screenshot_quality: int = 1,
+        pause_stream_on_input: bool = False,
+        wda_probe_timeout: float = 2.0,
+        wda_connect_timeout: float = 5.0,
+        element_wait_timeout: float = 10.0,
+        retry_backoff: Tuple[float, ...] = (0.5, 1.0)
     ):
         """
         Initialize iOS device connection.
@@ -38,34 +152,83 @@ class IOSDevice:
             usb: Whether to connect via USB using tidevice
             port: WebDriverAgent port (default: 8100)
             auto_setup: Whether to automatically attempt WebDriverAgent setup
+            mjpeg_port: WebDriverAgent MJPEG stream port (e.g. 9100) used for
+                screenshots so they don't share the action session
+            screenshot_quality: WebDriverAgent screenshotQuality setting
+                (0 = lossless PNG, 1 = medium JPEG, 2 = low JPEG)
+            pause_stream_on_input: Stop the MJPEG stream during taps, swipes,
+                scrolls and typing; WebDriverAgent serves both on one thread
+            wda_probe_timeout: Seconds to wait for a single /status probe
+            wda_connect_timeout: Seconds to wait for an auto-started
+                WebDriverAgent to come up
+            element_wait_timeout: Default seconds to wait for elements in
+                tap_element, type_in_element and wait_for_element
+            retry_backoff: Delay before each connection retry; one retry per entry
         """
         self.device = device
         self.simulator = simulator
         self.usb = usb
         self.port = port
         self.auto_setup = auto_setup
+        self.mjpeg_port = mjpeg_port
+        self.screenshot_quality = screenshot_quality
+        self.pause_stream_on_input = pause_stream_on_input
+        self.wda_probe_timeout = wda_probe_timeout
+        self.wda_connect_timeout = wda_connect_timeout
+        self.element_wait_timeout = element_wait_timeout
+        self.retry_backoff = tuple(retry_backoff)
+        self.mjpeg_url = None
         self.client = None
-        self.session = None
+        # One WebDriverAgent session per bundle id (None is the default session)
+        self._sessions: Dict[Optional[str], Any] = {}
+        # Hot-path shortcut to the default session; None until connected or after invalidation
+        self._default_session = None
+        # (fetched at, WDA /status response) reused by get_device_info
+        self._status_cache: Tuple[float, Optional[Dict[str, Any]]] = (0.0, None)
+        # (orientation, window size); the size only changes when the device rotates
+        self._window_size: Optional[Tuple[str, Tuple[int, int]]] = None
         self.connection_url = None
         
+        # Bumped by every UI-mutating action; part of the tree text cache key
+        self._ui_seq = 0
+        # (UI action sequence, taken at, tree text) from the last get_tree_text
+        self._tree_text_cache: Optional[Tuple[int, float, str]] = None
+        # (UI action sequence, taken at, tree state) from the last snapshot
+        self._tree_cache: Optional[Tuple[int, float, TreeState]] = None
+        
+        # Keep-alive HTTP session reused for every direct WebDriverAgent request
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=16)
+        self._http.mount('http://', adapter)
+        self._http.mount('https://', adapter)
+        self._http.headers['Connection'] = 'keep-alive'
+        # Separate pool for the MJPEG stream so frames never queue behind actions
+        self._mjpeg_http = requests.Session()
+        # wdaproxy started by auto-setup, terminated on close()
+        self._wda_proc: Optional[subprocess.Popen] = None
+        # Pointer events queued inside a batch() block; None when not batching
+        self._pending_actions: Optional[List[Dict[str, Any]]] = None
+        
+        # Screenshot fetch/encode workers, created on first use
+        self._screenshot_executor: Optional[ThreadPoolExecutor] = None
+        
         self._connect()
     
     def _connect(self):
         """Establish connection to iOS device with retry logic and setup validation."""
-        connection_attempts = 3
+        connection_attempts = len(self.retry_backoff) + 1
         
         for attempt in range(connection_attempts):
             try:
                 # Build connection URL
                 self.connection_url = self._build_connection_url()
+                self.mjpeg_url = self._build_mjpeg_url()
                 
                 # Check if WebDriverAgent is running before attempting connection
                 if not self._check_wda_availability():
                     if self.auto_setup and attempt == 0:
-                        print("WebDriverAgent not detected. Attempting to start...")
-                        if self._attempt_wda_setup():
-                            time.sleep(3)  # Give WDA time to start
-                        else:
+                        logger.info("WebDriverAgent not detected. Attempting to start...")
+                        if not self._attempt_wda_setup():
                             self._print_setup_instructions()
                             raise ConnectionError("WebDriverAgent is not running. Please follow setup instructions above.")
                     else:
@@ -84,23 +247,20 @@ class IOSDevice:
                 
                 # Test connection with timeout
                 status = self.client.status()
-                print(f"✅ Connected to iOS device: {status.get('message', 'Ready')}")
-                
-                # Print device info
-                try:
-                    device_info = status.get('ios', {})
-                    if device_info:
-                        print(f"📱 Device: {device_info.get('name', 'Unknown')} - iOS {device_info.get('version', 'Unknown')}")
-                except:
-                    pass
+                self._status_cache = (time.monotonic(), status)
+                logger.debug("✅ Connected to iOS device: %s", status)
                 
+                self._apply_wda_settings()
+                self.get_session()  # Open the default session up front
                 return  # Success
                 
             except Exception as e:
                 if attempt < connection_attempts - 1:
-                    print(f"⚠️  Connection attempt {attempt + 1} failed: {str(e)}")
-                    print(f"🔄 Retrying in 2 seconds... ({connection_attempts - attempt - 1} attempts remaining)")
-                    time.sleep(2)
+                    # Configured backoff plus jitter so parallel clients don't retry in lockstep
+                    delay = self.retry_backoff[attempt] + random.random() * 0.2
+                    logger.warning("⚠️  Connection attempt %d failed: %s", attempt + 1, e)
+                    logger.warning("🔄 Retrying in %.1f seconds... (%d attempts remaining)", delay, connection_attempts - attempt - 1)
+                    time.sleep(delay)
                 else:
                     self._print_setup_instructions()
                     raise ConnectionError(
@@ -109,6 +269,57 @@ class IOSDevice:
                         f"Please ensure WebDriverAgent is properly set up and running."
                     )
     
+    def _wda_command(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Send a raw WebDriverAgent command and return its 'value'.
+        
+        facebook-wda 1.x opens its own connections, so over the network the
+        command goes through the pooled keep-alive session instead. USB has
+        no HTTP URL, so it falls back to the wda client.
+        """
+        if self.usb:
+            args = (path,) if payload is None else (path, payload)
+            return getattr(self.client.http, method)(*args).value
+        url = f"{self.connection_url}/{path.lstrip('/')}"
+        response = self._http.request(method.upper(), url, json=payload, timeout=60)
+        response.raise_for_status()
+        return response.json().get('value')
+    
+    def _apply_wda_settings(self):
+        """Have WebDriverAgent encode screenshots compactly and cap page source depth."""
+        settings = {
+            'screenshotQuality': self.screenshot_quality,
+            'snapshotMaxDepth': SNAPSHOT_MAX_DEPTH,
+        }
+        if self.mjpeg_port:
+            settings['mjpegServerScreenshotQuality'] = MJPEG_SCREENSHOT_QUALITY
+            settings['mjpegServerFramerate'] = MJPEG_FRAMERATE
+        try:
+            self.client.appium_settings(settings)
+        except Exception as e:
+            # Older WebDriverAgent builds don't support settings; everything still works, just slower
+            logger.warning("⚠️  Could not apply WebDriverAgent settings: %s", e)
+    
+    def pause_stream(self):
+        """Throttle MJPEG frame production to its minimum so touch input isn't queued behind it."""
+        self.client.appium_settings({'mjpegServerFramerate': MJPEG_PAUSED_FRAMERATE})
+    
+    def resume_stream(self):
+        """Restore the configured MJPEG frame rate."""
+        self.client.appium_settings({'mjpegServerFramerate': MJPEG_FRAMERATE})
+    
+    @contextmanager
+    def _stream_paused(self):
+        """Pause the MJPEG stream for the duration of an input action, if enabled."""
+        if not (self.mjpeg_port and self.pause_stream_on_input):
+            yield
+            return
+        self.pause_stream()
+        try:
+            yield
+        finally:
+            self.resume_stream()
+    
     def _build_connection_url(self) -> str:
         """Build the connection URL based on configuration."""
         if self.usb:
@@ -116,7 +327,8 @@ class IOSDevice:
         
         if self.device:
             url = f"http://{self.device}"
-            if ':' not in self.device:
+            # urlsplit copes with IPv6 literals like [::1], which also contain ':'
+            if urlsplit(url).port is None:
                 url = f"http://{self.device}:{self.port}"
         elif self.simulator:
             url = f"http://localhost:{self.port}"
@@ -125,95 +337,126 @@ class IOSDevice:
         
         return url
     
+    def _build_mjpeg_url(self) -> Optional[str]:
+        """Build the MJPEG stream URL, or None when streaming is not configured."""
+        if not self.mjpeg_port:
+            return None
+        
+        if self.usb:
+            host = '127.0.0.1'  # Relayed by tidevice
+        else:
+            host = urlsplit(self.connection_url).hostname or '127.0.0.1'
+        return f"http://{host}:{self.mjpeg_port}"
+    
     def _check_wda_availability(self) -> bool:
         """Check if WebDriverAgent is available and responding."""
         if self.usb:
             # For USB connections, we need to check if tidevice can connect
             try:
+                import tidevice  # Only USB setups need it
                 devices = tidevice.Device.list()
                 if not devices and not self.device:
-                    print("⚠️  No iOS devices found via USB")
+                    logger.warning("⚠️  No iOS devices found via USB")
                     return False
                 return True
             except Exception as e:
-                print(f"⚠️  USB device check failed: {e}")
+                logger.warning("⚠️  USB device check failed: %s", e)
                 return False
         else:
-            # For network connections, check if the port is accessible
-            try:
-                if self.connection_url == "USB":
-                    return True
-                    
-                # Parse URL to get host and port
-                url_parts = self.connection_url.replace('http://', '').split(':')
-                host = url_parts[0]
-                port = int(url_parts[1]) if len(url_parts) > 1 else self.port
-                
-                # Try to connect to the port
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(3)
-                result = sock.connect_ex((host, port))
-                sock.close()
-                
-                if result == 0:
-                    # Port is open, check if it's WebDriverAgent
-                    try:
-                        response = requests.get(f"{self.connection_url}/status", timeout=5)
-                        return response.status_code == 200
-                    except:
-                        return False
-                else:
+            # For network connections, probe /status over the pooled keep-alive session
+            if self.connection_url == "USB":
+                return True
+            return self._probe_once(self.connection_url)
+    
+    def _probe_once(self, url: str) -> bool:
+        """Check once whether WebDriverAgent answers at url."""
+        try:
+            response = self._http.head(f"{url}/status", timeout=self.wda_probe_timeout)
+            if not response.ok:
+                # WDA builds that don't route HEAD answer 404/405; confirm with the GET it does serve
+                response = self._http.get(f"{url}/status", timeout=self.wda_probe_timeout)
+            return response.ok
+        except requests.RequestException:
+            return False
+    
+    def _wait_for_wda(self, timeout: Optional[float] = None) -> bool:
+        """
+        Poll WebDriverAgent availability on 200ms ticks until it answers or timeout passes.
+        
+        Candidate URLs are probed in parallel and the first one to answer
+        becomes the connection URL. timeout defaults to wda_connect_timeout.
+        """
+        if timeout is None:
+            timeout = self.wda_connect_timeout
+        
+        if self.usb:
+            # The USB check only sees the device, not WDA, so there is nothing to poll
+            time.sleep(timeout)
+            return self._check_wda_availability()
+        
+        # wdaproxy serves on the local port, which may come up before the device address
+        candidates = list(dict.fromkeys([self.connection_url, f"http://127.0.0.1:{self.port}"]))
+        executor = ThreadPoolExecutor(max_workers=len(candidates))
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                probes = {executor.submit(self._probe_once, url): url for url in candidates}
+                for probe in as_completed(probes):
+                    if probe.result():
+                        self.connection_url = probes[probe]
+                        return True
+                if time.monotonic() >= deadline:
                     return False
-                    
-            except Exception as e:
-                print(f"⚠️  Network connectivity check failed: {e}")
-                return False
+                time.sleep(0.2)
+        finally:
+            executor.shutdown(wait=False)
     
     def _attempt_wda_setup(self) -> bool:
         """Attempt to automatically start WebDriverAgent."""
         try:
-            print("🚀 Attempting to start WebDriverAgent...")
+            logger.info("🚀 Attempting to start WebDriverAgent...")
             
             if self.usb or not self.simulator:
                 # Try to start WebDriverAgent using tidevice
+                import tidevice
                 devices = tidevice.Device.list()
                 if devices:
                     device_udid = self.device if self.device else devices[0]
-                    print(f"📱 Starting WebDriverAgent on device: {device_udid}")
+                    logger.info("📱 Starting WebDriverAgent on device: %s", device_udid)
                     
                     # Start WebDriverAgent in background
                     cmd = ['tidevice', 'wdaproxy', '-B', 'com.facebook.WebDriverAgentRunner.xctrunner', '--port', str(self.port)]
                     if self.device:
                         cmd.extend(['--udid', self.device])
                     
-                    process = subprocess.Popen(
+                    # Nothing reads wdaproxy's output; a full pipe would stall it
+                    self._wda_proc = subprocess.Popen(
                         cmd,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL,
                         start_new_session=True
                     )
+                    # Don't leave wdaproxy orphaned if this device is never closed
+                    weakref.finalize(self, self._wda_proc.terminate)
                     
-                    print("⏳ Waiting for WebDriverAgent to start...")
-                    time.sleep(5)  # Give it time to start
-                    
-                    # Check if it's now available
-                    if self._check_wda_availability():
-                        print("✅ WebDriverAgent started successfully!")
+                    logger.info("⏳ Waiting for WebDriverAgent to start...")
+                    if self._wait_for_wda():
+                        logger.info("✅ WebDriverAgent started successfully!")
                         return True
                     else:
-                        print("⚠️  WebDriverAgent may still be starting...")
+                        logger.warning("⚠️  WebDriverAgent may still be starting...")
                         return False
                 else:
-                    print("⚠️  No iOS devices found for WebDriverAgent setup")
+                    logger.warning("⚠️  No iOS devices found for WebDriverAgent setup")
                     return False
             
             elif self.simulator:
                 # For simulator, suggest Appium or manual setup
-                print("📋 For iOS Simulator, please use Appium or manual WebDriverAgent setup")
+                logger.info("📋 For iOS Simulator, please use Appium or manual WebDriverAgent setup")
                 return False
                 
         except Exception as e:
-            print(f"⚠️  Auto-setup failed: {e}")
+            logger.warning("⚠️  Auto-setup failed: %s", e)
             return False
             
         return False
@@ -263,19 +506,39 @@ class IOSDevice:
         
         print("="*80 + "\n")
     
+    def close(self):
+        """Drop cached sessions, release pooled connections and stop an auto-started wdaproxy."""
+        self._invalidate_session()
+        self._http.close()
+        self._mjpeg_http.close()
+        if self._screenshot_executor:
+            self._screenshot_executor.shutdown(wait=False)
+        if self._wda_proc and self._wda_proc.poll() is None:
+            self._wda_proc.terminate()
+    
     def get_device(self):
         """Get the underlying device client."""
         if not self.client:
             raise ConnectionError("Device not connected. Please check WebDriverAgent setup.")
         return self.client
     
-    def get_device_info(self) -> Dict[str, Any]:
-        """Get detailed device information."""
+    def get_device_info(self, fresh: bool = False) -> Dict[str, Any]:
+        """
+        Get detailed device information.
+        
+        Args:
+            fresh: Always query WDA instead of reusing a status fetched
+                within the last STATUS_CACHE_TTL seconds
+        """
         try:
             if not self.client:
                 return {"error": "Not connected"}
-                
-            status = self.client.status()
+            
+            now = time.monotonic()
+            fetched_at, status = self._status_cache
+            if fresh or status is None or now - fetched_at >= STATUS_CACHE_TTL:
+                status = self.client.status()
+                self._status_cache = (now, status)
             info = {
                 "connected": True,
                 "connection_url": self.connection_url,
@@ -286,86 +549,325 @@ class IOSDevice:
             }
             
             # Add device-specific info if available
-            if 'ios' in status:
-                info.update(status['ios'])
+            if ios := status.get('ios'):
+                info.update(ios)
                 
             return info
             
         except Exception as e:
             return {"error": f"Failed to get device info: {e}"}
-        """Get the underlying device client."""
-        return self.client
     
     def get_session(self, bundle_id: Optional[str] = None):
-        """Get or create a session for app control."""
-        if not self.session or bundle_id:
-            if bundle_id:
-                self.session = self.client.session(bundle_id)
-            else:
-                self.session = self.client.session()
-        return self.session
+        """Get or create a session for app control, reusing it on later calls."""
+        session = self._sessions.get(bundle_id)
+        if session is None:
+            session = self.client.session(bundle_id) if bundle_id else self.client.session()
+            self._sessions[bundle_id] = session
+        if bundle_id is None:
+            self._default_session = session
+        return session
     
-    def get_state(self, use_vision: bool = False) -> 'IOSState':
+    def _resolve_element(self, selector: str, value: str):
+        """Build a wda element query from a selector type and value."""
+        kwarg = _SELECTOR_KWARGS.get(selector)
+        if kwarg is None:
+            raise ValueError(f"Unsupported selector type: {selector}")
+        return (self._default_session or self.get_session())(**{kwarg: value})
+    
+    def _get_window_size(self, orientation: Optional[str] = None) -> Tuple[int, int]:
+        """Get the device window size, cached per orientation.
+        
+        Pass the orientation when the caller has already read it (tree snapshots
+        do), so a rotation by hand is noticed without an extra WDA request.
+        Otherwise the cached size is trusted until set_orientation resets it.
+        """
+        if self._window_size is not None and orientation in (None, self._window_size[0]):
+            return self._window_size[1]
+        session = self._default_session or self.get_session()
+        if orientation is None:
+            orientation = session.orientation
+        self._window_size = (orientation, session.window_size())
+        return self._window_size[1]
+    
+    def _invalidate_session(self, bundle_id: Optional[str] = None):
+        """Drop the cached session for bundle_id, or every session when None."""
+        if bundle_id is None:
+            self._sessions.clear()
+            self._default_session = None
+        else:
+            self._sessions.pop(bundle_id, None)
+    
+    def get_state(
+        self,
+        use_vision: bool = False,
+        use_ui_tree: bool = True,
+        image_format: str = 'JPEG',
+        quality: int = 75,
+        vision_scale: float = 1.0
+    ) -> 'IOSState':
         """
         Get current device state with optional screenshot.
         
         Args:
             use_vision: Whether to include annotated screenshot
+            use_ui_tree: Whether to snapshot the accessibility tree. When False,
+                only a plain screenshot is taken and the tree state is empty.
+            image_format: Screenshot encoding (JPEG, WEBP or PNG)
+            quality: Lossy encoding quality (1-100)
+            vision_scale: Scale applied to the screenshot before annotating it
             
         Returns:
             IOSState object containing tree state and optional screenshot
         """
+        if not use_vision and not use_ui_tree:
+            raise ValueError("At least one of use_vision or use_ui_tree must be enabled")
+        
         try:
+            if not use_vision:
+                # Tree-only fast path: one tree walk and no image work at all
+                return IOSState(tree_state=self._get_tree_state(IOSTree(self)))
+            
+            if not use_ui_tree:
+                # Screenshot-only fast path: skip the accessibility snapshot entirely
+                tree_state = TreeState(
+                    elements=[],
+                    interactive_elements=[],
+                    window_size=(0, 0),
+                    orientation='UNKNOWN',
+                    timestamp=time.time()
+                )
+                if vision_scale != 1.0 or self.mjpeg_url:
+                    # get_screenshot prefers the MJPEG stream, which the raw WDA endpoint bypasses
+                    encoded = self.screenshot_bytes_async(vision_scale, image_format, quality)
+                else:
+                    # WDA already hands back an encoded full-size frame; only re-encode on a format mismatch
+                    encoded = self._get_screenshot_executor().submit(self._wda_screenshot_as, image_format, quality)
+                return IOSState(
+                    tree_state=tree_state,
+                    screenshot_factory=encoded.result,
+                    screenshot_format=image_format
+                )
+            
+            # Fetch the frame while the accessibility tree is being snapshotted
+            frame = self.get_screenshot_async(scale=vision_scale)
             tree = IOSTree(self)
-            tree_state = tree.get_state()
+            tree_state = self._get_tree_state(tree)
             
-            if use_vision:
+            def render_screenshot() -> bytes:
                 nodes = tree_state.interactive_elements
-                annotated_screenshot = tree.annotated_screenshot(nodes=nodes, scale=1.0)
-                screenshot = self.screenshot_in_bytes(annotated_screenshot)
-            else:
-                screenshot = None
-                
-            return IOSState(tree_state=tree_state, screenshot=screenshot)
+                annotated_screenshot = tree.annotated_screenshot(nodes=nodes, scale=vision_scale, screenshot=frame.result())
+                # Labels are already drawn, so shrinking now leaves element coordinates untouched
+                width, height = annotated_screenshot.size
+                shrink = VISION_MAX_EDGE / max(width, height)
+                if shrink < 1.0:
+                    from PIL import Image
+                    new_size = (int(width * shrink), int(height * shrink))
+                    annotated_screenshot = annotated_screenshot.resize(new_size, Image.Resampling.BILINEAR)
+                return self.screenshot_in_bytes(annotated_screenshot, image_format, quality)
+            
+            # Annotation and encoding only run if the screenshot is actually read
+            return IOSState(
+                tree_state=tree_state,
+                screenshot_factory=render_screenshot,
+                screenshot_format=image_format
+            )
             
         except Exception as e:
             raise RuntimeError(f"Failed to get device state: {e}")
     
-    def get_screenshot(self, scale: float = 0.7) -> Image.Image:
+    def _get_tree_state(self, tree: IOSTree) -> TreeState:
+        """Snapshot the UI tree, reusing a very recent snapshot if no action ran since."""
+        if self._tree_cache is not None:
+            seq, taken_at, tree_state = self._tree_cache
+            if seq == self._ui_seq and time.monotonic() - taken_at < TREE_STATE_TTL:
+                return tree_state
+        
+        seq = self._ui_seq
+        tree_state = tree.get_state()
+        self._tree_cache = (seq, time.monotonic(), tree_state)
+        return tree_state
+    
+    def get_tree_text(self) -> str:
+        """
+        Get the UI tree as text, reusing the last result while the UI is unchanged.
+        
+        A result is reused only if no action has run since and it is younger
+        than TREE_TEXT_CACHE_TTL. The check is local, so a hit costs no
+        WebDriverAgent round trip.
+        """
+        if self._tree_text_cache is not None:
+            seq, taken_at, text = self._tree_text_cache
+            if seq == self._ui_seq and time.monotonic() - taken_at < TREE_TEXT_CACHE_TTL:
+                return text
+        
+        seq = self._ui_seq
+        text = self._get_tree_state(IOSTree(self)).to_string()
+        self._tree_text_cache = (seq, time.monotonic(), text)
+        return text
+    
+    def get_screenshot(self, scale: float = 0.7, resample: Optional[int] = None) -> 'Image.Image':
         """
         Take screenshot of the device.
         
         Args:
             scale: Scale factor for the image (default: 0.7)
+            resample: Pillow resampling filter; by default BILINEAR, or LANCZOS
+                for downscales below 0.5. Pass LANCZOS when accuracy matters.
             
         Returns:
             PIL Image object
         """
+        from PIL import Image  # Only vision requests pay for importing Pillow
+        
         try:
-            session = self.get_session()
-            screenshot = session.screenshot()
+            screenshot = None
+            if self.mjpeg_url:
+                try:
+                    screenshot = Image.open(BytesIO(self._read_mjpeg_frame()))
+                except Exception:
+                    screenshot = None  # Fall back to the WDA screenshot endpoint
+            
+            if screenshot is None:
+                session = self._default_session or self.get_session()
+                screenshot = session.screenshot()
             
             if screenshot is None:
                 raise ValueError("Screenshot capture returned None")
             
             # Scale image if needed
             if scale != 1.0:
-                size = (int(screenshot.width * scale), int(screenshot.height * scale))
-                screenshot.thumbnail(size, Image.Resampling.LANCZOS)
+                width, height = screenshot.size
+                new_size = (int(width * scale), int(height * scale))
+                if screenshot.format == 'JPEG':
+                    # Let the JPEG decoder do the power-of-two part of the reduction
+                    screenshot.draft('RGB', new_size)
+                if screenshot.size != new_size:
+                    if resample is None:
+                        # Bilinear is plenty for mild downscales and much cheaper than Lanczos
+                        resample = Image.Resampling.BILINEAR if scale >= 0.5 else Image.Resampling.LANCZOS
+                    screenshot = screenshot.resize(new_size, resample=resample, reducing_gap=2.0)
             
             return screenshot
             
         except Exception as e:
             raise RuntimeError(f"Failed to take screenshot: {e}")
     
-    def screenshot_in_bytes(self, screenshot: Image.Image) -> bytes:
-        """Convert PIL Image to bytes."""
+    def get_screenshot_bytes(self) -> bytes:
+        """
+        Take a full-size screenshot as the bytes WebDriverAgent returns.
+        
+        Returns:
+            PNG or JPEG image bytes, depending on the screenshotQuality setting
+        """
+        try:
+            return base64.b64decode(self._wda_command('get', 'screenshot'))
+        except Exception as e:
+            raise RuntimeError(f"Failed to take screenshot: {e}")
+    
+    def _wda_screenshot_as(self, format: str = 'JPEG', quality: int = 75) -> bytes:
+        """Full-size WDA screenshot in format, decoded and re-encoded only if WDA used another encoding."""
+        data = self.get_screenshot_bytes()
+        if _image_format(data) == format.upper():
+            return data
+        from PIL import Image
+        return self.screenshot_in_bytes(Image.open(BytesIO(data)), format, quality)
+    
+    def get_page_source_bytes(self) -> Optional[bytes]:
+        """
+        Fetch the raw JSON accessibility source over the pooled HTTP session.
+        
+        Returns:
+            Response body bytes, or None over USB where WDA has no HTTP URL
+        """
+        if self.usb:
+            return None
+        response = self._http.get(f"{self.connection_url}/wda/accessibleSource", timeout=30)
+        response.raise_for_status()
+        return response.content
+    
+    def _get_screenshot_executor(self) -> ThreadPoolExecutor:
+        """Get the screenshot worker pool, creating it on first use."""
+        if self._screenshot_executor is None:
+            self._screenshot_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='ios-screenshot')
+        return self._screenshot_executor
+    
+    def get_screenshot_async(self, scale: float = 0.7, resample: Optional[int] = None) -> 'Future[Image.Image]':
+        """Take a screenshot on a background worker; see get_screenshot."""
+        return self._get_screenshot_executor().submit(self.get_screenshot, scale, resample)
+    
+    def screenshot_bytes_async(self, scale: float = 0.7, format: str = 'JPEG', quality: int = 75) -> 'Future[bytes]':
+        """
+        Take and encode a screenshot as a two-stage background pipeline.
+        
+        The encode runs as its own task, so the fetch worker is free to grab
+        the next frame while this one is being compressed. Async callers can
+        await the result with asyncio.wrap_future.
+        
+        Returns:
+            Future resolving to the encoded image bytes
+        """
+        executor = self._get_screenshot_executor()
+        result: Future = Future()
+        
+        def encode(fetch: Future):
+            try:
+                result.set_result(self.screenshot_in_bytes(fetch.result(), format, quality))
+            except Exception as e:
+                result.set_exception(e)
+        
+        def schedule_encode(fetch: Future):
+            try:
+                executor.submit(encode, fetch)
+            except RuntimeError as e:
+                result.set_exception(e)  # The pool was shut down by close()
+        
+        fetch = self.get_screenshot_async(scale)
+        fetch.add_done_callback(schedule_encode)
+        return result
+    
+    def _read_mjpeg_frame(self) -> bytes:
+        """Read a single JPEG frame from the WebDriverAgent MJPEG stream."""
+        with self._mjpeg_http.get(self.mjpeg_url, stream=True, timeout=5) as response:
+            response.raise_for_status()
+            buffer = bytearray()
+            for chunk in response.iter_content(chunk_size=16384):
+                buffer += chunk
+                start = buffer.find(b'\xff\xd8')
+                if start != -1:
+                    end = buffer.find(b'\xff\xd9', start + 2)
+                    if end != -1:
+                        return bytes(buffer[start:end + 2])
+        raise ValueError("MJPEG stream closed before a full frame was received")
+    
+    def screenshot_in_bytes(self, screenshot: 'Image.Image', format: str = 'JPEG', quality: int = 75) -> bytes:
+        """
+        Convert PIL Image to bytes.
+        
+        Args:
+            screenshot: Image to encode
+            format: JPEG, WEBP or PNG (lossless, much slower and larger)
+            quality: Lossy encoding quality (1-100), ignored for PNG
+            
+        Returns:
+            Encoded image bytes
+        """
         try:
             if screenshot is None:
                 raise ValueError("Screenshot is None")
             
             io = BytesIO()
-            screenshot.save(io, format='PNG')
+            format = format.upper()
+            if format == 'PNG':
+                # Fastest zlib level: slightly larger files, several times quicker to encode
+                screenshot.save(io, format='PNG', compress_level=1, optimize=False)
+            elif format == 'WEBP':
+                screenshot.save(io, format='WEBP', quality=quality, method=0)
+            else:
+                if screenshot.mode != 'RGB':
+                    screenshot = screenshot.convert('RGB')  # JPEG has no alpha channel
+                screenshot.save(io, format=format, quality=quality, optimize=False, progressive=False)
+            # getvalue() hands back BytesIO's own buffer (trimmed in place) rather
+            # than copying it, as long as no getbuffer() view is alive
             bytes_data = io.getvalue()
             
             if len(bytes_data) == 0:
@@ -378,65 +880,184 @@ class IOSDevice:
     
     def tap(self, x: int, y: int):
         """Tap on specific coordinates."""
-        session = self.get_session()
-        session.tap(x, y)
+        self._ui_seq += 1
+        if self._pending_actions is not None:
+            self._pending_actions.extend(_tap_events(x, y))
+            return
+        session = self._default_session or self.get_session()
+        with self._stream_paused():
+            session.tap(x, y)
     
     def long_press(self, x: int, y: int, duration: float = 1.0):
         """Long press on specific coordinates."""
-        session = self.get_session()
-        session.tap_hold(x, y, duration)
+        self._ui_seq += 1
+        if self._pending_actions is not None:
+            self._pending_actions.extend(_tap_events(x, y, duration))
+            return
+        session = self._default_session or self.get_session()
+        with self._stream_paused():
+            session.tap_hold(x, y, duration)
     
     def swipe(self, x1: int, y1: int, x2: int, y2: int, duration: float = 0.5):
         """Swipe from one coordinate to another."""
-        session = self.get_session()
-        session.swipe(x1, y1, x2, y2, duration)
+        self._ui_seq += 1
+        if self._pending_actions is not None:
+            self._pending_actions.extend(_swipe_events(x1, y1, x2, y2, duration))
+            return
+        session = self._default_session or self.get_session()
+        with self._stream_paused():
+            session.swipe(x1, y1, x2, y2, duration)
+    
+    def perform_actions(self, pointer_events: List[Dict[str, Any]]):
+        """Send a sequence of pointer events to WebDriverAgent in one W3C Actions request."""
+        self._ui_seq += 1
+        session = self._default_session or self.get_session()
+        payload = {
+            'actions': [{
+                'type': 'pointer',
+                'id': 'finger1',
+                'parameters': {'pointerType': 'touch'},
+                'actions': pointer_events
+            }]
+        }
+        with self._stream_paused():
+            self._wda_command('post', f'/session/{session.session_id}/actions', payload)
+    
+    @contextmanager
+    def batch(self):
+        """
+        Queue tap, long_press, swipe and wait calls and send them as one W3C Actions request.
+        
+        The queue is flushed when the outermost block exits, or earlier when
+        any other device action needs the queued touches to happen first.
+        Nothing is sent if the block raises.
+        
+        Example:
+            with device.batch():
+                device.tap(100, 200)
+                device.swipe(100, 600, 100, 200)
+        """
+        # Nested blocks join the outermost queue, which flushes once at the end
+        outermost = self._pending_actions is None
+        if outermost:
+            self._pending_actions = []
+        try:
+            yield self
+        except BaseException:
+            if outermost:
+                self._pending_actions = None
+            raise
+        if not outermost:
+            return
+        try:
+            self.flush()
+        finally:
+            self._pending_actions = None
+    
+    def flush(self):
+        """Send pointer events queued by batch() now."""
+        if self._pending_actions:
+            events, self._pending_actions = self._pending_actions, []
+            self.perform_actions(events)
+    
+    def batch_actions(self, actions: List[Dict[str, Any]]) -> List[str]:
+        """
+        Execute a sequence of actions with as few WebDriverAgent requests as possible.
+        
+        Contiguous tap, long_press, swipe and wait steps are merged into a single
+        W3C Actions request; any other step is executed through its regular method.
+        
+        Args:
+            actions: List of {'action': name, 'args': {...}} steps
+            
+        Returns:
+            One result line per step
+        """
+        other_steps = {
+            'type': self.type_text,
+            'home': self.home,
+            'volume': self.volume,
+            'scroll': self.scroll,
+            'orientation': self.set_orientation,
+            'alert': self.handle_alert,
+            'app_control': self.app_control,
+            'tap_element': self.tap_element,
+        }
+        results = []
+        pending = []
+        self.flush()  # Touches queued by an enclosing batch() go first
+        
+        for step in actions:
+            name = step.get('action')
+            args = step.get('args') or {}
+            
+            if name in _POINTER_STEPS:
+                pending.extend(_POINTER_STEPS[name](args))
+                results.append(f"Queued {name}")
+                continue
+            
+            if pending:
+                self.perform_actions(pending)
+                pending = []
+            
+            method = other_steps.get(name)
+            if method is None:
+                raise ValueError(f"Unsupported batch action: {name}")
+            result = method(**args)
+            results.append(result if isinstance(result, str) else f"Executed {name}")
+        
+        if pending:
+            self.perform_actions(pending)
+        
+        return results
     
     def type_text(self, text: str, clear: bool = False):
         """Type text on the device."""
-        session = self.get_session()
-        if clear:
-            # Clear current text if needed
-            session.send_keys("\b" * 50)  # Delete existing text
-        session.send_keys(text)
+        self._ui_seq += 1
+        self.flush()  # Queued touches must land first
+        session = self._default_session or self.get_session()
+        with self._stream_paused():
+            if clear:
+                # One clear request on the focused field instead of a backspace per character
+                element = session(predicate=FOCUSED_ELEMENT_PREDICATE).get(timeout=0, raise_error=False)
+                if element is None:
+                    session.send_keys("\b" * BLIND_CLEAR_BACKSPACES)
+                else:
+                    try:
+                        element.clear_text()
+                    except wda.WDAError:
+                        session.send_keys("\b" * len(element.value or ''))
+            session.send_keys(text)
     
-    def tap_element(self, selector: str, value: str, timeout: float = 10.0) -> str:
+    def tap_element(self, selector: str, value: str, timeout: Optional[float] = None) -> str:
         """
         Tap on element using various selectors.
         
         Args:
             selector: Selector type (id, name, label, className, xpath, predicate)
             value: Selector value
-            timeout: Timeout for element search
+            timeout: Timeout for element search (default: element_wait_timeout)
             
         Returns:
             Success message or error
         """
+        self._ui_seq += 1
+        self.flush()  # Queued touches must land first
         try:
-            session = self.get_session()
-            
-            # Build selector based on type
-            if selector == 'id':
-                element = session(id=value)
-            elif selector == 'name':
-                element = session(name=value)
-            elif selector == 'label':
-                element = session(label=value)
-            elif selector == 'className':
-                element = session(className=value)
-            elif selector == 'xpath':
-                element = session(xpath=value)
-            elif selector == 'predicate':
-                element = session(predicate=value)
-            else:
-                return f"Unsupported selector type: {selector}"
+            element = self._resolve_element(selector, value)
             
             # Wait for element and tap
-            if element.wait(timeout=timeout):
+            if element.wait(timeout=self.element_wait_timeout if timeout is None else timeout):
                 element.tap()
                 return f"Tapped element: {selector}={value}"
             else:
                 return f"Element not found: {selector}={value}"
                 
+        except ValueError as e:
+            return str(e)
+        except wda.WDAError as e:
+            self._invalidate_session()  # Force a fresh session on the next call
+            return f"Error tapping element: {e}"
         except Exception as e:
             return f"Error tapping element: {e}"
     
@@ -446,30 +1067,16 @@ class IOSDevice:
         value: str,
         text: str,
         clear: bool = True,
-        timeout: float = 10.0
+        timeout: Optional[float] = None
     ) -> str:
         """Type text in specific element."""
+        self._ui_seq += 1
+        self.flush()  # Queued touches must land first
         try:
-            session = self.get_session()
-            
-            # Build selector
-            if selector == 'id':
-                element = session(id=value)
-            elif selector == 'name':
-                element = session(name=value)
-            elif selector == 'label':
-                element = session(label=value)
-            elif selector == 'className':
-                element = session(className=value)
-            elif selector == 'xpath':
-                element = session(xpath=value)
-            elif selector == 'predicate':
-                element = session(predicate=value)
-            else:
-                return f"Unsupported selector type: {selector}"
+            element = self._resolve_element(selector, value)
             
             # Wait for element and type
-            if element.wait(timeout=timeout):
+            if element.wait(timeout=self.element_wait_timeout if timeout is None else timeout):
                 if clear:
                     element.clear_text()
                 element.type(text)
@@ -477,91 +1084,109 @@ class IOSDevice:
             else:
                 return f"Element not found: {selector}={value}"
                 
+        except ValueError as e:
+            return str(e)
+        except wda.WDAError as e:
+            self._invalidate_session()  # Force a fresh session on the next call
+            return f"Error typing in element: {e}"
         except Exception as e:
             return f"Error typing in element: {e}"
     
     def home(self):
         """Press home button."""
+        self._ui_seq += 1
+        self.flush()  # Queued touches must land first
         self.client.home()
     
     def volume(self, direction: str):
         """Press volume buttons."""
-        session = self.get_session()
-        if direction.lower() == 'up':
-            session.press("volumeUp")
-        elif direction.lower() == 'down':
-            session.press("volumeDown")
-        else:
+        self._ui_seq += 1
+        self.flush()  # Queued touches must land first
+        session = self._default_session or self.get_session()
+        key = _VOLUME_KEYS.get(direction.lower())
+        if key is None:
             raise ValueError("Direction must be 'up' or 'down'")
+        session.press(key)
     
     def lock(self):
         """Lock the device."""
-        session = self.get_session()
+        self._ui_seq += 1
+        self.flush()  # Queued touches must land first
+        session = self._default_session or self.get_session()
         session.lock()
     
     def unlock(self):
         """Unlock the device."""
-        session = self.get_session()
+        self._ui_seq += 1
+        self.flush()  # Queued touches must land first
+        session = self._default_session or self.get_session()
         session.unlock()
     
     def is_locked(self) -> bool:
         """Check if device is locked."""
-        session = self.get_session()
+        session = self._default_session or self.get_session()
         return session.locked()
     
     def app_control(self, action: str, bundle_id: str) -> str:
         """Control app lifecycle."""
+        self._ui_seq += 1
+        self.flush()  # Queued touches must land first
         try:
-            session = self.get_session()
+            session = self._default_session or self.get_session()
             
             if action == 'launch':
                 session.app_activate(bundle_id)
                 return f"Launched app: {bundle_id}"
             elif action == 'terminate':
                 session.app_terminate(bundle_id)
+                self._invalidate_session(bundle_id)
                 return f"Terminated app: {bundle_id}"
             elif action == 'activate':
                 session.app_activate(bundle_id)
                 return f"Activated app: {bundle_id}"
             elif action == 'state':
-                state = session.app_state(bundle_id)
-                state_map = {1: 'not_installed', 2: 'background', 4: 'running'}
-                state_name = state_map.get(state.get('value', 0), 'unknown')
+                value = session.app_state(bundle_id).get('value', 0)
+                state_name = _APP_STATES[value] if 0 <= value < len(_APP_STATES) else 'unknown'
                 return f"App {bundle_id} state: {state_name}"
             else:
                 return f"Unsupported action: {action}"
                 
+        except wda.WDAError as e:
+            self._invalidate_session()  # Force a fresh session on the next call
+            return f"Error controlling app: {e}"
         except Exception as e:
             return f"Error controlling app: {e}"
     
     def wait(self, duration: float):
         """Wait for specified duration."""
+        self._ui_seq += 1  # The UI may settle while waiting
+        if self._pending_actions is not None:
+            self._pending_actions.extend(_pause_events(duration))
+            return
         time.sleep(duration)
     
     def get_orientation(self) -> str:
         """Get current device orientation."""
-        session = self.get_session()
+        session = self._default_session or self.get_session()
         return session.orientation
     
     def set_orientation(self, orientation: str):
         """Set device orientation."""
-        session = self.get_session()
-        orientation_map = {
-            'portrait': wda.PORTRAIT,
-            'landscape': wda.LANDSCAPE,
-            'landscape_left': wda.LANDSCAPE_LEFT,
-            'landscape_right': wda.LANDSCAPE_RIGHT
-        }
-        
-        if orientation.lower() in orientation_map:
-            session.orientation = orientation_map[orientation.lower()]
-        else:
+        self._ui_seq += 1
+        self.flush()  # Queued touches must land first
+        session = self._default_session or self.get_session()
+        value = _ORIENTATIONS.get(orientation.lower())
+        if value is None:
             raise ValueError(f"Invalid orientation: {orientation}")
+        session.orientation = value
+        self._window_size = None
     
     def handle_alert(self, action: str, text: str = None) -> str:
         """Handle iOS alerts and dialogs."""
+        self._ui_seq += 1
+        self.flush()  # Queued touches must land first
         try:
-            session = self.get_session()
+            session = self._default_session or self.get_session()
             
             if action == 'accept':
                 session.alert.accept()
@@ -578,61 +1203,63 @@ class IOSDevice:
             else:
                 return f"Unsupported alert action: {action}"
                 
+        except wda.WDAError as e:
+            self._invalidate_session()  # Force a fresh session on the next call
+            return f"Error handling alert: {e}"
         except Exception as e:
             return f"Error handling alert: {e}"
     
     def scroll(self, direction: str, distance: float = 0.5):
         """Scroll in specified direction."""
-        session = self.get_session()
-        
-        if direction.lower() == 'up':
-            session.swipe_up()
-        elif direction.lower() == 'down':
-            session.swipe_down()
-        elif direction.lower() == 'left':
-            session.swipe_left()
-        elif direction.lower() == 'right':
-            session.swipe_right()
-        else:
-            # Custom scroll with distance
-            width, height = session.window_size()
-            center_x, center_y = width // 2, height // 2
-            
-            if direction.lower() == 'up':
-                end_y = center_y - int(height * distance)
-                session.swipe(center_x, center_y, center_x, end_y)
-            elif direction.lower() == 'down':
-                end_y = center_y + int(height * distance)
-                session.swipe(center_x, center_y, center_x, end_y)
-            elif direction.lower() == 'left':
-                end_x = center_x - int(width * distance)
-                session.swipe(center_x, center_y, end_x, center_y)
-            elif direction.lower() == 'right':
-                end_x = center_x + int(width * distance)
-                session.swipe(center_x, center_y, end_x, center_y)
-    
-    def wait_for_element(self, selector: str, value: str, timeout: float = 10.0) -> bool:
+        self._ui_seq += 1
+        self.flush()  # Queued touches must land first
+        session = self._default_session or self.get_session()
+        
+        direction = direction.lower()
+        method = _SCROLL_METHODS.get(direction)
+        
+        with self._stream_paused():
+            if method:
+                getattr(session, method)()
+            else:
+                # Custom scroll with distance
+                width, height = self._get_window_size()
+                center_x, center_y = width // 2, height // 2
+                
+                if direction == 'up':
+                    end_y = center_y - int(height * distance)
+                    session.swipe(center_x, center_y, center_x, end_y)
+                elif direction == 'down':
+                    end_y = center_y + int(height * distance)
+                    session.swipe(center_x, center_y, center_x, end_y)
+                elif direction == 'left':
+                    end_x = center_x - int(width * distance)
+                    session.swipe(center_x, center_y, end_x, center_y)
+                elif direction == 'right':
+                    end_x = center_x + int(width * distance)
+                    session.swipe(center_x, center_y, end_x, center_y)
+    
+    def wait_for_element(self, selector: str, value: str, timeout: Optional[float] = None) -> bool:
         """Wait for element to appear."""
         try:
-            session = self.get_session()
-            
-            # Build selector
-            if selector == 'id':
-                element = session(id=value)
-            elif selector == 'name':
-                element = session(name=value)
-            elif selector == 'label':
-                element = session(label=value)
-            elif selector == 'className':
-                element = session(className=value)
-            elif selector == 'xpath':
-                element = session(xpath=value)
-            elif selector == 'predicate':
-                element = session(predicate=value)
-            else:
-                return False
+            element = self._resolve_element(selector, value)
             
-            return element.wait(timeout=timeout)
+            # Back off between lookups so a missing element doesn't flood WDA with snapshots
+            if timeout is None:
+                timeout = self.element_wait_timeout
+            deadline = time.monotonic() + timeout
+            delay = 0.05
+            while True:
+                if element.exists:
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 1.5, 0.5)
             
+        except wda.WDAError:
+            self._invalidate_session()
+            return False
         except Exception as e:
             return False
\ No newline at end of file
@@ -4,21 +4,32 @@ iOS Views Module
 Contains classes for representing iOS device state and UI structure.
 """
 
-from typing import Optional
-from dataclasses import dataclass
+from typing import Callable, Optional
+from dataclasses import dataclass, field
 from src.tree import TreeState
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class IOSState:
     """Represents the current state of an iOS device."""
     
     tree_state: TreeState
-    screenshot: Optional[bytes] = None
+    screenshot_factory: Optional[Callable[[], bytes]] = None
+    screenshot_format: str = 'PNG'
+    _screenshot: Optional[bytes] = field(default=None, init=False, repr=False)
+    
+    @property
+    def screenshot(self) -> Optional[bytes]:
+        """Encoded screenshot, rendered on first access."""
+        if self._screenshot is None and self.screenshot_factory is not None:
+            # Frozen instance: the one-time render cache is set behind the dataclass guard
+            object.__setattr__(self, '_screenshot', self.screenshot_factory())
+        return self._screenshot
     
     def __str__(self) -> str:
         """String representation of the iOS state."""
-        result = f"iOS Device State:\n"
-        result += f"Tree State: {self.tree_state}\n"
-        result += f"Screenshot: {'Available' if self.screenshot else 'Not available'}"
-        return result
\ No newline at end of file
+        return (
+            f"iOS Device State:\n"
+            f"Tree State: {self.tree_state}\n"
+            f"Screenshot: {'Available' if self.screenshot_factory else 'Not available'}"
+        )
\ No newline at end of file
@@ -5,13 +5,29 @@ Handles iOS UI element hierarchy parsing and state management
 similar to Android's UIAutomator but for iOS using WebDriverAgent.
 """
 
-from typing import List, Dict, Any, Optional, Tuple
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
 from dataclasses import dataclass
+from functools import lru_cache
+import hashlib
 import json
-from PIL import Image, ImageDraw, ImageFont
+import sys
+from .config import TAPPABLE_ELEMENT_TYPES
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Optional; the stdlib json module is used instead
 
-@dataclass
+if TYPE_CHECKING:
+    from PIL import Image
+
+PARSED_SOURCE_CACHE_SIZE = 8
+# Digest of a raw page source -> (elements, interactive elements), most recent last
+_parsed_sources: 'OrderedDict[bytes, Tuple[List[IOSElement], List[IOSElement]]]' = OrderedDict()
+
+
+@dataclass(slots=True)
 class IOSElement:
     """Represents an iOS UI element."""
     
@@ -42,6 +58,8 @@ class IOSElement:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert element to dictionary representation."""
+        bounds = self.bounds
+        x, y, width, height = bounds
         return {
             'id': self.id,
             'name': self.name,
@@ -51,8 +69,8 @@ class IOSElement:
             'enabled': self.enabled,
             'visible': self.visible,
             'interactive': self.interactive,
-            'bounds': self.bounds,
-            'center': self.center
+            'bounds': bounds,
+            'center': (x + width // 2, y + height // 2)
         }
 
 
@@ -68,57 +86,101 @@ class TreeState:
     
     def to_string(self) -> str:
         """Convert tree state to string representation."""
-        result = f"iOS UI Tree State:\n"
-        result += f"Window Size: {self.window_size}\n"
-        result += f"Orientation: {self.orientation}\n"
-        result += f"Total Elements: {len(self.elements)}\n"
-        result += f"Interactive Elements: {len(self.interactive_elements)}\n\n"
+        # Collect lines and join once; repeated += would copy the text so far every time
+        lines = [
+            "iOS UI Tree State:",
+            f"Window Size: {self.window_size}",
+            f"Orientation: {self.orientation}",
+            f"Total Elements: {len(self.elements)}",
+            f"Interactive Elements: {len(self.interactive_elements)}",
+            "",
+            # Show all elements with text content
+            "All Elements with Text:",
+        ]
         
-        # Show all elements with text content
-        result += "All Elements with Text:\n"
-        text_elements = []
+        header_length = len(lines)
         for i, element in enumerate(self.elements):
             if element.name or element.label:
-                bounds = element.bounds
-                text_info = f"{i+1}. {element.className}"
-                if element.name:
-                    text_info += f" name='{element.name}'"
-                if element.label and element.label != element.name:
-                    text_info += f" label='{element.label}'"
-                text_info += f" at ({bounds[0]}, {bounds[1]}, {bounds[2]}, {bounds[3]})"
-                if element.interactive:
-                    text_info += " (interactive)"
-                text_elements.append(text_info)
+                x, y, width, height = element.bounds
+                name = f" name='{element.name}'" if element.name else ""
+                label = f" label='{element.label}'" if element.label and element.label != element.name else ""
+                interactive = " (interactive)" if element.interactive else ""
+                lines.append(f"{i+1}. {element.className}{name}{label} at ({x}, {y}, {width}, {height}){interactive}")
         
-        if text_elements:
-            result += "\n".join(text_elements) + "\n\n"
-        else:
-            result += "No elements with text found.\n\n"
+        if len(lines) == header_length:
+            lines.append("No elements with text found.")
         
-        result += "Interactive Elements:\n"
+        lines.append("")
+        lines.append("Interactive Elements:")
         if self.interactive_elements:
             for i, element in enumerate(self.interactive_elements):
-                bounds = element.bounds
-                result += f"{i+1}. {element.className}"
-                if element.name:
-                    result += f" '{element.name}'"
-                if element.label:
-                    result += f" [{element.label}]"
-                result += f" at ({bounds[0]}, {bounds[1]}, {bounds[2]}, {bounds[3]})\n"
+                x, y, width, height = element.bounds
+                name = f" '{element.name}'" if element.name else ""
+                label = f" [{element.label}]" if element.label else ""
+                lines.append(f"{i+1}. {element.className}{name}{label} at ({x}, {y}, {width}, {height})")
         else:
-            result += "No interactive elements found.\n"
+            lines.append("No interactive elements found.")
         
-        return result
+        return "\n".join(lines) + "\n"
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert tree state to dictionary representation."""
+        elements = [elem.to_dict() for elem in self.elements]
+        # Interactive elements are also in self.elements; reuse their dicts
+        by_id = {id(elem): data for elem, data in zip(self.elements, elements)}
         return {
-            'elements': [elem.to_dict() for elem in self.elements],
-            'interactive_elements': [elem.to_dict() for elem in self.interactive_elements],
+            'elements': elements,
+            'interactive_elements': [by_id.get(id(elem)) or elem.to_dict() for elem in self.interactive_elements],
             'window_size': self.window_size,
             'orientation': self.orientation,
             'timestamp': self.timestamp
         }
+    
+    def to_json_bytes(self) -> bytes:
+        """Serialize the tree state to JSON, with orjson when it is installed."""
+        data = self.to_dict()
+        if orjson is not None:
+            return orjson.dumps(data)
+        return json.dumps(data, separators=(',', ':')).encode()
+
+
+@lru_cache(maxsize=1)
+def _label_font():
+    """Load the annotation font once per process, falling back to Pillow's default."""
+    from PIL import ImageFont
+    
+    try:
+        return ImageFont.truetype("/System/Library/Fonts/Arial.ttf", 16)
+    except (OSError, ImportError):  # Missing font file, or Pillow built without FreeType
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=256)
+def _label_sprite(text: str, font) -> 'Image.Image':
+    """Render an element number on its red badge once; pasted for every later use."""
+    from PIL import Image, ImageDraw
+    
+    left, top, right, bottom = font.getbbox(text)
+    sprite = Image.new('RGB', (right - left + 3, bottom - top + 3), 'red')
+    # Shift by the bbox origin: glyphs start below the text anchor, not at it
+    ImageDraw.Draw(sprite).text((1 - left, 1 - top), text, fill='white', font=font)
+    return sprite
+
+
+def _is_zero_size(frame: Optional[Dict[str, Any]]) -> bool:
+    """Whether a node frame is present but has no area."""
+    return bool(frame) and (frame.get('width', 0) <= 0 or frame.get('height', 0) <= 0)
+
+
+def _has_sized_descendant(node: Dict[str, Any]) -> bool:
+    """Whether any node below this one has a frame with area, or no frame at all."""
+    stack = list(node.get('children') or ())
+    while stack:
+        child = stack.pop()
+        if not _is_zero_size(child.get('frame')):
+            return True
+        stack.extend(child.get('children') or ())
+    return False
 
 
 class IOSTree:
@@ -127,24 +189,8 @@ class IOSTree:
     def __init__(self, ios_device):
         """Initialize with iOS device instance."""
         self.ios_device = ios_device
-        self.interactive_types = {
-            'XCUIElementTypeButton',
-            'XCUIElementTypeTextField',
-            'XCUIElementTypeSecureTextField', 
-            'XCUIElementTypeTextView',
-            'XCUIElementTypeSwitch',
-            'XCUIElementTypeSlider',
-            'XCUIElementTypeCell',
-            'XCUIElementTypeLink',
-            'XCUIElementTypeImage',
-            'XCUIElementTypeTab',
-            'XCUIElementTypeTabBar',
-            'XCUIElementTypeNavigationBar',
-            'XCUIElementTypeSearchField',
-            'XCUIElementTypeSegmentedControl',
-            'XCUIElementTypePicker',
-            'XCUIElementTypePickerWheel'
-        }
+        # Shared immutable set; no per-instance copy
+        self.interactive_types = TAPPABLE_ELEMENT_TYPES
     
     def get_state(self) -> TreeState:
         """Get current UI tree state."""
@@ -153,16 +199,20 @@ class IOSTree:
             
             session = self.ios_device.get_session()
             
-            # Get page source (UI hierarchy)
-            source = session.source(accessible=True)  # Get JSON format
-            
-            # Parse elements
-            elements = self._parse_elements(source)
-            interactive_elements = [elem for elem in elements if elem.interactive]
+            # Get page source (UI hierarchy), raw when WDA is reachable over HTTP
+            raw_source = self.ios_device.get_page_source_bytes()
+            if raw_source is not None:
+                elements, interactive_elements = self._parse_source_bytes(raw_source)
+            else:
+                source = session.source(accessible=True)  # Get JSON format
+                
+                # Parse elements, collecting the interactive ones in the same pass
+                interactive_elements = []
+                elements = self._parse_elements(source, interactive_elements=interactive_elements)
             
             # Get additional device info
-            window_size = session.window_size()
             orientation = session.orientation
+            window_size = self.ios_device._get_window_size(orientation)
             
             return TreeState(
                 elements=elements,
@@ -183,58 +233,105 @@ class IOSTree:
                 timestamp=time.time()
             )
     
-    def _parse_elements(self, source: Dict[str, Any], parent_frame: Optional[Dict] = None) -> List[IOSElement]:
-        """Parse UI elements from source hierarchy."""
+    def _parse_source_bytes(self, raw_source: bytes) -> Tuple[List[IOSElement], List[IOSElement]]:
+        """Parse a raw JSON page source, reusing the result for a byte-identical source."""
+        digest = hashlib.blake2b(raw_source, digest_size=16).digest()
+        cached = _parsed_sources.get(digest)
+        if cached is not None:
+            _parsed_sources.move_to_end(digest)
+            return cached
+        
+        interactive_elements = []
+        # orjson decodes multi-megabyte sources several times faster than json
+        source = (orjson.loads if orjson is not None else json.loads)(raw_source)['value']
+        elements = self._parse_elements(source, interactive_elements=interactive_elements)
+        _parsed_sources[digest] = (elements, interactive_elements)
+        if len(_parsed_sources) > PARSED_SOURCE_CACHE_SIZE:
+            _parsed_sources.popitem(last=False)
+        return elements, interactive_elements
+    
+    def _parse_elements(
+        self,
+        source: Dict[str, Any],
+        parent_frame: Optional[Dict] = None,
+        interactive_elements: Optional[List[IOSElement]] = None
+    ) -> List[IOSElement]:
+        """
+        Parse UI elements from source hierarchy in depth-first order.
+        
+        If interactive_elements is given, interactive elements are also
+        appended to it as they are created. Below the root, a zero-size node
+        whose whole subtree is zero-size too is not descended into. Hidden or
+        zero-size containers can still hold on-screen children, so those
+        subtrees are walked and _create_element judges each node.
+        """
         elements = []
         
         if not isinstance(source, dict):
             return elements
         
-        # Create element from current node
-        element = self._create_element(source, parent_frame)
-        if element:
-            elements.append(element)
-        
-        # Process children recursively
-        children = source.get('children', [])
-        if isinstance(children, list):
-            for child in children:
-                child_elements = self._parse_elements(child, source.get('frame'))
-                elements.extend(child_elements)
+        # Explicit stack of (node, parent x, parent y): no frame per node and no depth limit
+        if parent_frame:
+            stack = [(source, parent_frame.get('x', 0), parent_frame.get('y', 0))]
+        else:
+            stack = [(source, 0, 0)]
+        while stack:
+            node, offset_x, offset_y = stack.pop()
+            
+            element = self._create_element(node, offset_x, offset_y)
+            if element:
+                elements.append(element)
+                if element.interactive and interactive_elements is not None:
+                    interactive_elements.append(element)
+            
+            children = node.get('children')
+            if not children:
+                continue
+            
+            frame = node.get('frame')
+            if node is not source and _is_zero_size(frame) and not _has_sized_descendant(node):
+                continue  # Prune the whole subtree, e.g. recycled list cell pools
+            
+            # Reversed so the first child is popped next, keeping document order
+            if frame:
+                child_x, child_y = frame.get('x', 0), frame.get('y', 0)
+            else:
+                child_x = child_y = 0
+            stack.extend((child, child_x, child_y) for child in reversed(children))
         
         return elements
     
-    def _create_element(self, node: Dict[str, Any], parent_frame: Optional[Dict] = None) -> Optional[IOSElement]:
-        """Create IOSElement from node data."""
+    def _create_element(self, node: Dict[str, Any], offset_x: float = 0, offset_y: float = 0) -> Optional[IOSElement]:
+        """Create IOSElement from node data, offsetting its frame by the parent's origin."""
         try:
             # Extract basic properties
             element_id = node.get('identifier', '')
             name = node.get('name', '')
             label = node.get('label', '')
-            class_name = node.get('type', '')
-            frame = node.get('frame', {})
+            # Interned: thousands of elements share a few dozen type names
+            class_name = sys.intern(node.get('type', ''))
+            frame = node.get('frame') or {}
             enabled = node.get('enabled', True)
             visible = node.get('visible', True)
             
-            # Calculate absolute frame if parent frame exists
-            if parent_frame and frame:
-                # Adjust frame relative to parent
+            # Calculate absolute frame; a parent at the origin leaves the frame as is
+            if frame and (offset_x or offset_y):
                 abs_frame = {
-                    'x': frame.get('x', 0) + parent_frame.get('x', 0),
-                    'y': frame.get('y', 0) + parent_frame.get('y', 0),
+                    'x': frame.get('x', 0) + offset_x,
+                    'y': frame.get('y', 0) + offset_y,
                     'width': frame.get('width', 0),
                     'height': frame.get('height', 0)
                 }
             else:
                 abs_frame = frame
             
-            # Determine if element is interactive
+            # Determine if element is interactive; the type test rejects most nodes, so it goes first
             interactive = (
-                enabled and 
-                visible and
                 class_name in self.interactive_types and
-                abs_frame.get('width', 0) > 0 and
-                abs_frame.get('height', 0) > 0
+                enabled and
+                visible and
+                frame.get('width', 0) > 0 and
+                frame.get('height', 0) > 0
             )
             
             return IOSElement(
@@ -251,32 +348,34 @@ class IOSTree:
         except Exception as e:
             return None
     
-    def annotated_screenshot(self, nodes: List[IOSElement], scale: float = 1.0) -> Image.Image:
-        """Create annotated screenshot with element highlights."""
+    def annotated_screenshot(
+        self,
+        nodes: List[IOSElement],
+        scale: float = 1.0,
+        screenshot: Optional['Image.Image'] = None
+    ) -> 'Image.Image':
+        """Create annotated screenshot with element highlights, taking one unless given."""
+        from PIL import ImageDraw
+        
         try:
             # Take screenshot
-            screenshot = self.ios_device.get_screenshot(scale=scale)
+            if screenshot is None:
+                screenshot = self.ios_device.get_screenshot(scale=scale)
             
             # Create drawing context
             draw = ImageDraw.Draw(screenshot)
             
-            # Try to load a font, fallback to default
-            try:
-                font = ImageFont.truetype("/System/Library/Fonts/Arial.ttf", 16)
-            except:
-                font = ImageFont.load_default()
+            font = _label_font()
             
             # Annotate interactive elements
             for i, element in enumerate(nodes):
                 if not element.interactive:
                     continue
                 
-                # Scale bounds according to screenshot scale
+                # Scale bounds according to screenshot scale; bounds are already ints at 1.0
                 x, y, width, height = element.bounds
-                x = int(x * scale)
-                y = int(y * scale)
-                width = int(width * scale)
-                height = int(height * scale)
+                if scale != 1.0:
+                    x, y, width, height = int(x * scale), int(y * scale), int(width * scale), int(height * scale)
                 
                 # Draw rectangle around element
                 draw.rectangle(
@@ -285,24 +384,8 @@ class IOSTree:
                     width=2
                 )
                 
-                # Draw element number
-                text = str(i + 1)
-                text_bbox = draw.textbbox((0, 0), text, font=font)
-                text_width = text_bbox[2] - text_bbox[0]
-                text_height = text_bbox[3] - text_bbox[1]
-                
-                # Position text
-                text_x = x + 2
-                text_y = y + 2
-                
-                # Draw background for text
-                draw.rectangle(
-                    [text_x - 1, text_y - 1, text_x + text_width + 1, text_y + text_height + 1],
-                    fill='red'
-                )
-                
-                # Draw text
-                draw.text((text_x, text_y), text, fill='white', font=font)
+                # Paste the element number badge: one call instead of measure, fill and draw
+                screenshot.paste(_label_sprite(str(i + 1), font), (x + 1, y + 1))
             
             return screenshot
             
@@ -4,11 +4,11 @@ iOS Tree Configuration
 Configuration settings for iOS UI tree parsing and element detection.
 """
 
-# Interactive element types that can be automated
-INTERACTIVE_ELEMENT_TYPES = {
+# Element types a user taps or types into; IOSTree marks these interactive
+TAPPABLE_ELEMENT_TYPES = frozenset({
     'XCUIElementTypeButton',
     'XCUIElementTypeTextField',
-    'XCUIElementTypeSecureTextField', 
+    'XCUIElementTypeSecureTextField',
     'XCUIElementTypeTextView',
     'XCUIElementTypeSwitch',
     'XCUIElementTypeSlider',
@@ -21,11 +21,15 @@ INTERACTIVE_ELEMENT_TYPES = {
     'XCUIElementTypeSearchField',
     'XCUIElementTypeSegmentedControl',
     'XCUIElementTypePicker',
-    'XCUIElementTypePickerWheel',
+    'XCUIElementTypePickerWheel'
+})
+
+# Interactive element types that can be automated, including scroll containers
+INTERACTIVE_ELEMENT_TYPES = TAPPABLE_ELEMENT_TYPES | frozenset({
     'XCUIElementTypeCollectionView',
     'XCUIElementTypeTableView',
     'XCUIElementTypeScrollView'
-}
+})
 
 # Minimum element size to be considered interactive
 MIN_INTERACTIVE_SIZE = {
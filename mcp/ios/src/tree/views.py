@@ -6,19 +6,39 @@ Visualization and representation utilities for iOS UI trees.
 
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
+from functools import cached_property
 
 
-@dataclass 
+@dataclass(slots=True)
 class ElementView:
-    """View representation of a single iOS element."""
+    """View of a single iOS element; reads its fields from the element itself."""
     
     index: int
-    element_type: str
-    name: str
-    label: str
-    bounds: tuple
-    center: tuple
-    interactive: bool
+    element: Any
+    
+    @property
+    def element_type(self) -> str:
+        return self.element.className
+    
+    @property
+    def name(self) -> str:
+        return self.element.name
+    
+    @property
+    def label(self) -> str:
+        return self.element.label
+    
+    @property
+    def bounds(self) -> tuple:
+        return self.element.bounds
+    
+    @property
+    def center(self) -> tuple:
+        return self.element.center
+    
+    @property
+    def interactive(self) -> bool:
+        return self.element.interactive
     
     def __str__(self) -> str:
         """String representation of element view."""
@@ -43,27 +63,22 @@ class TreeView:
         """Initialize with tree state."""
         self.tree_state = tree_state
     
+    @cached_property
+    def _interactive_views(self) -> List[ElementView]:
+        """Views of the interactive elements, built once per TreeView."""
+        return [
+            ElementView(index=i + 1, element=element)
+            for i, element in enumerate(self.tree_state.interactive_elements)
+        ]
+    
     def get_interactive_elements_view(self) -> List[ElementView]:
         """Get view representation of interactive elements."""
-        views = []
-        
-        for i, element in enumerate(self.tree_state.interactive_elements):
-            view = ElementView(
-                index=i + 1,
-                element_type=element.className,
-                name=element.name,
-                label=element.label,
-                bounds=element.bounds,
-                center=element.center,
-                interactive=element.interactive
-            )
-            views.append(view)
-        
-        return views
+        # A copy, so callers cannot change the views cached for later calls
+        return list(self._interactive_views)
     
     def format_elements_list(self) -> str:
         """Format interactive elements as a readable list."""
-        views = self.get_interactive_elements_view()
+        views = self._interactive_views
         
         if not views:
             return "No interactive elements found."
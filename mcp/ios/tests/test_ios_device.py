@@ -0,0 +1,248 @@
+import unittest
+import os
+import sys
+from io import BytesIO
+from unittest.mock import Mock, patch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ios import IOSDevice, STATUS_CACHE_TTL, TREE_STATE_TTL, TREE_TEXT_CACHE_TTL
+
+
+def make_device():
+    """Build an IOSDevice wired to a stubbed wda client and session, without connecting."""
+    with patch.object(IOSDevice, '_connect'):
+        device = IOSDevice(device='127.0.0.1:8100')
+    device.connection_url = 'http://127.0.0.1:8100'
+    device.client = Mock()
+    session = Mock(session_id='session-1')
+    device._sessions[None] = session
+    device._default_session = session
+    return device
+
+
+class TestBatch(unittest.TestCase):
+    """Ordering of queued touches against other device actions"""
+
+    def setUp(self):
+        self.device = make_device()
+        # One parent mock records the order of raw WDA commands and wda client calls
+        self.calls = Mock()
+        self.device._wda_command = self.calls.wda_command
+        self.device.client.home = self.calls.home
+        self.device._default_session.app_activate = self.calls.app_activate
+
+    def call_names(self):
+        return [name for name, _, _ in self.calls.mock_calls]
+
+    def test_touches_are_sent_once_when_block_exits(self):
+        with self.device.batch():
+            self.device.tap(10, 20)
+            self.device.swipe(0, 0, 100, 100)
+            self.assertEqual(self.call_names(), [])
+
+        self.assertEqual(self.call_names(), ['wda_command'])
+        method, path, payload = self.calls.wda_command.call_args.args
+        self.assertEqual((method, path), ('post', '/session/session-1/actions'))
+        self.assertEqual(len(payload['actions'][0]['actions']), 7)
+
+    def test_other_actions_flush_queued_touches_first(self):
+        with self.device.batch():
+            self.device.tap(10, 20)
+            self.device.home()
+            self.device.tap(30, 40)
+            self.device.app_control('launch', 'com.example.app')
+
+        self.assertEqual(
+            self.call_names(),
+            ['wda_command', 'home', 'wda_command', 'app_activate']
+        )
+
+    def test_nested_batch_joins_outer_queue(self):
+        with self.device.batch():
+            self.device.tap(10, 20)
+            with self.device.batch():
+                self.device.tap(30, 40)
+            self.assertEqual(self.call_names(), [])
+
+        self.assertEqual(self.call_names(), ['wda_command'])
+        events = self.calls.wda_command.call_args.args[2]['actions'][0]['actions']
+        self.assertEqual([event['x'] for event in events if event['type'] == 'pointerMove'], [10, 30])
+
+    def test_nothing_is_sent_when_block_raises(self):
+        with self.assertRaises(ValueError):
+            with self.device.batch():
+                self.device.tap(10, 20)
+                raise ValueError("stop")
+
+        self.assertEqual(self.call_names(), [])
+        self.assertIsNone(self.device._pending_actions)
+
+
+class TestTreeTextCache(unittest.TestCase):
+    """Reuse and invalidation of get_tree_text results"""
+
+    def setUp(self):
+        self.device = make_device()
+        self.device._get_tree_state = Mock(side_effect=lambda tree: Mock(to_string=Mock(return_value='tree')))
+
+    @patch('src.ios.IOSTree')
+    def test_repeated_call_reuses_text(self, _):
+        self.assertEqual(self.device.get_tree_text(), 'tree')
+        self.assertEqual(self.device.get_tree_text(), 'tree')
+        self.assertEqual(self.device._get_tree_state.call_count, 1)
+        # The hit is answered locally, without asking WDA for the app or orientation
+        self.device._default_session.app_current.assert_not_called()
+
+    @patch('src.ios.IOSTree')
+    def test_action_invalidates_text(self, _):
+        self.device.get_tree_text()
+        self.device.tap(10, 20)
+        self.device.get_tree_text()
+        self.assertEqual(self.device._get_tree_state.call_count, 2)
+
+    @patch('src.ios.IOSTree')
+    @patch('src.ios.time.monotonic')
+    def test_text_expires_after_ttl(self, monotonic, _):
+        monotonic.return_value = 100.0
+        self.device.get_tree_text()
+        monotonic.return_value = 100.0 + TREE_TEXT_CACHE_TTL
+        self.device.get_tree_text()
+        self.assertEqual(self.device._get_tree_state.call_count, 2)
+
+
+class TestTreeStateCache(unittest.TestCase):
+    """Reuse of very recent tree snapshots in _get_tree_state"""
+
+    def setUp(self):
+        self.device = make_device()
+        self.tree = Mock()
+
+    def test_snapshot_is_reused_without_wda_lookups(self):
+        first = self.device._get_tree_state(self.tree)
+        self.assertIs(self.device._get_tree_state(self.tree), first)
+        self.assertEqual(self.tree.get_state.call_count, 1)
+        self.device._default_session.app_current.assert_not_called()
+
+    def test_action_invalidates_snapshot(self):
+        self.device._get_tree_state(self.tree)
+        self.device.swipe(0, 0, 100, 100)
+        self.device._get_tree_state(self.tree)
+        self.assertEqual(self.tree.get_state.call_count, 2)
+
+    @patch('src.ios.time.monotonic')
+    def test_snapshot_expires_after_ttl(self, monotonic):
+        monotonic.return_value = 0.0
+        self.device._get_tree_state(self.tree)
+        monotonic.return_value = TREE_STATE_TTL
+        self.device._get_tree_state(self.tree)
+        self.assertEqual(self.tree.get_state.call_count, 2)
+
+
+class TestWindowSize(unittest.TestCase):
+    """Caching of the window size across reads and rotations"""
+
+    def setUp(self):
+        self.device = make_device()
+        self.session = self.device._default_session
+        self.session.orientation = 'PORTRAIT'
+        self.session.window_size.return_value = (375, 667)
+
+    def test_cached_size_is_read_without_wda_requests(self):
+        self.device._get_window_size()
+        self.session.reset_mock()
+        self.assertEqual(self.device._get_window_size(), (375, 667))
+        self.assertEqual(self.device._get_window_size('PORTRAIT'), (375, 667))
+        self.assertEqual(self.session.mock_calls, [])
+
+    def test_new_orientation_from_caller_refetches(self):
+        self.device._get_window_size('PORTRAIT')
+        self.session.window_size.return_value = (667, 375)
+        self.assertEqual(self.device._get_window_size('LANDSCAPE'), (667, 375))
+        self.assertEqual(self.session.window_size.call_count, 2)
+
+    def test_set_orientation_resets_size(self):
+        self.device._get_window_size()
+        self.device.set_orientation('landscape')
+        self.session.window_size.return_value = (667, 375)
+        self.assertEqual(self.device._get_window_size(), (667, 375))
+
+
+class TestScreenshotOnlyState(unittest.TestCase):
+    """Frame source used by get_state when the UI tree is skipped"""
+
+    def setUp(self):
+        self.device = make_device()
+        self.device._wda_command = Mock()
+
+    def tearDown(self):
+        self.device.close()
+
+    def test_full_size_uses_mjpeg_stream_when_configured(self):
+        from PIL import Image
+        frame = BytesIO()
+        Image.new('RGB', (40, 80), 'blue').save(frame, format='JPEG')
+        self.device.mjpeg_url = 'http://127.0.0.1:9100'
+        self.device._read_mjpeg_frame = Mock(return_value=frame.getvalue())
+
+        state = self.device.get_state(use_vision=True, use_ui_tree=False)
+        self.assertEqual(Image.open(BytesIO(state.screenshot)).size, (40, 80))
+        self.device._read_mjpeg_frame.assert_called_once()
+        self.device._wda_command.assert_not_called()
+
+
+class TestDeviceInfoCache(unittest.TestCase):
+    """Reuse of the WDA /status response in get_device_info"""
+
+    def setUp(self):
+        self.device = make_device()
+        self.device.client.status.return_value = {'ios': {'ip': '127.0.0.1'}}
+
+    @patch('src.ios.time.monotonic')
+    def test_status_is_reused_within_ttl(self, monotonic):
+        monotonic.return_value = 100.0
+        self.device.get_device_info()
+        monotonic.return_value = 100.0 + STATUS_CACHE_TTL / 2
+        info = self.device.get_device_info()
+        self.assertEqual(self.device.client.status.call_count, 1)
+        self.assertEqual(info['ip'], '127.0.0.1')
+
+    @patch('src.ios.time.monotonic')
+    def test_status_is_refetched_after_ttl(self, monotonic):
+        monotonic.return_value = 100.0
+        self.device.get_device_info()
+        monotonic.return_value = 100.0 + STATUS_CACHE_TTL
+        self.device.get_device_info()
+        self.assertEqual(self.device.client.status.call_count, 2)
+
+    def test_fresh_bypasses_cache(self):
+        self.device.get_device_info()
+        self.device.get_device_info(fresh=True)
+        self.assertEqual(self.device.client.status.call_count, 2)
+
+
+class TestAppState(unittest.TestCase):
+    """Names reported for WDA's XCUIApplicationState values"""
+
+    def setUp(self):
+        self.device = make_device()
+
+    def app_state(self, value):
+        self.device._default_session.app_state.return_value = {'value': value}
+        return self.device.app_control('state', 'com.example.app')
+
+    def test_known_states(self):
+        self.assertEqual(self.app_state(1), 'App com.example.app state: not_installed')
+        self.assertEqual(self.app_state(2), 'App com.example.app state: background')
+        self.assertEqual(self.app_state(3), 'App com.example.app state: background')
+        self.assertEqual(self.app_state(4), 'App com.example.app state: running')
+
+    def test_out_of_range_state_is_unknown(self):
+        self.assertEqual(self.app_state(0), 'App com.example.app state: unknown')
+        self.assertEqual(self.app_state(-1), 'App com.example.app state: unknown')
+        self.assertEqual(self.app_state(9), 'App com.example.app state: unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
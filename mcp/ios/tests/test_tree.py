@@ -0,0 +1,146 @@
+import unittest
+import json
+import os
+import sys
+from unittest.mock import Mock, patch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.tree import IOSTree, _label_sprite, _parsed_sources
+from src.tree.views import TreeView
+
+
+def node(type_name, name='', x=0, y=0, width=100, height=40, visible=True, children=None):
+    """Build a WDA accessible-source node."""
+    data = {
+        'type': type_name,
+        'name': name,
+        'label': name,
+        'frame': {'x': x, 'y': y, 'width': width, 'height': height},
+        'enabled': True,
+        'visible': visible,
+    }
+    if children:
+        data['children'] = children
+    return data
+
+
+class TestParseElements(unittest.TestCase):
+    """Subtree pruning while walking the page source"""
+
+    def setUp(self):
+        self.tree = IOSTree(Mock())
+
+    def names(self, source):
+        return [element.name for element in self.tree._parse_elements(source)]
+
+    def test_hidden_wrapper_keeps_visible_children(self):
+        interactive = []
+        source = node('XCUIElementTypeApplication', 'app', width=375, height=667, children=[
+            node('XCUIElementTypeOther', 'wrapper', visible=False, children=[
+                node('XCUIElementTypeButton', 'inside-hidden'),
+            ]),
+            node('XCUIElementTypeButton', 'shown'),
+        ])
+        names = [element.name for element in self.tree._parse_elements(source, interactive_elements=interactive)]
+        self.assertEqual(names, ['app', 'wrapper', 'inside-hidden', 'shown'])
+        self.assertEqual([element.name for element in interactive], ['inside-hidden', 'shown'])
+
+    def test_zero_size_subtree_is_skipped(self):
+        source = node('XCUIElementTypeApplication', 'app', width=375, height=667, children=[
+            node('XCUIElementTypeCell', 'pooled', width=0, height=0, children=[
+                node('XCUIElementTypeButton', 'inside-pooled', width=0, height=0),
+            ]),
+        ])
+        self.assertEqual(self.names(source), ['app', 'pooled'])
+
+    def test_zero_size_wrapper_keeps_sized_descendants(self):
+        source = node('XCUIElementTypeApplication', 'app', width=375, height=667, children=[
+            node('XCUIElementTypeOther', 'wrapper', width=0, height=0, children=[
+                node('XCUIElementTypeOther', 'inner', width=0, height=0, children=[
+                    node('XCUIElementTypeButton', 'deep'),
+                ]),
+            ]),
+        ])
+        self.assertEqual(self.names(source), ['app', 'wrapper', 'inner', 'deep'])
+
+    def test_root_is_never_pruned(self):
+        source = node('XCUIElementTypeApplication', 'app', width=0, height=0, children=[
+            node('XCUIElementTypeButton', 'child', width=0, height=0),
+        ])
+        self.assertEqual(self.names(source), ['app', 'child'])
+
+    def test_hidden_button_is_not_interactive(self):
+        interactive = []
+        self.tree._parse_elements(node('XCUIElementTypeApplication', 'app', width=375, height=667, children=[
+            node('XCUIElementTypeButton', 'hidden', visible=False),
+            node('XCUIElementTypeButton', 'shown', x=10, y=20),
+        ]), interactive_elements=interactive)
+        self.assertEqual([element.name for element in interactive], ['shown'])
+        self.assertEqual(interactive[0].frame['x'], 10)
+
+
+class TestParsedSourceCache(unittest.TestCase):
+    """Reuse of parsed elements for byte-identical page sources"""
+
+    def setUp(self):
+        _parsed_sources.clear()
+        self.tree = IOSTree(Mock())
+        self.source = node('XCUIElementTypeApplication', 'app', children=[node('XCUIElementTypeButton', 'ok')])
+
+    def tearDown(self):
+        _parsed_sources.clear()
+
+    def raw(self, source):
+        return json.dumps({'value': source}).encode()
+
+    def test_identical_source_is_parsed_once(self):
+        with patch.object(IOSTree, '_parse_elements', wraps=self.tree._parse_elements) as parse:
+            first = self.tree._parse_source_bytes(self.raw(self.source))
+            second = self.tree._parse_source_bytes(self.raw(self.source))
+        self.assertEqual(parse.call_count, 1)
+        self.assertIs(first[0], second[0])
+
+    def test_changed_source_is_parsed_again(self):
+        self.tree._parse_source_bytes(self.raw(self.source))
+        self.source['children'].append(node('XCUIElementTypeButton', 'cancel'))
+        elements, interactive = self.tree._parse_source_bytes(self.raw(self.source))
+        self.assertEqual([element.name for element in interactive], ['ok', 'cancel'])
+        self.assertEqual(len(_parsed_sources), 2)
+
+
+class TestTreeView(unittest.TestCase):
+    """Element views built from a tree state"""
+
+    def test_returned_views_do_not_alias_the_cache(self):
+        tree = IOSTree(Mock())
+        interactive = []
+        tree._parse_elements(node('XCUIElementTypeApplication', 'app', width=375, height=667, children=[
+            node('XCUIElementTypeButton', 'ok'),
+        ]), interactive_elements=interactive)
+        view = TreeView(Mock(interactive_elements=interactive))
+
+        view.get_interactive_elements_view().clear()
+        self.assertEqual([v.name for v in view.get_interactive_elements_view()], ['ok'])
+        self.assertIn("'ok'", view.format_elements_list())
+
+
+class TestLabelSprite(unittest.TestCase):
+    """Element number badges drawn on annotated screenshots"""
+
+    def glyph_pixels(self, image):
+        return sum(count for count, color in image.getcolors(image.width * image.height) if color != (255, 0, 0))
+
+    def test_sprite_holds_the_whole_text(self):
+        from PIL import Image, ImageDraw, ImageFont
+        font = ImageFont.load_default(16)
+        for text in ('8', '42', '137'):
+            # The same text drawn on a roomy canvas, where nothing can be clipped
+            canvas = Image.new('RGB', (100, 60), 'red')
+            ImageDraw.Draw(canvas).text((20, 20), text, fill='white', font=font)
+            self.assertEqual(self.glyph_pixels(_label_sprite(text, font)), self.glyph_pixels(canvas), text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Persistent tidevice Helper
+
+Keeps a single Python interpreter with tidevice imported alive for the setup
+scripts. Each device probe is one newline-delimited JSON request over a pipe
+instead of a fresh `uv run` interpreter that re-imports tidevice.
+"""
+
+import atexit
+import io
+import json
+import select
+import subprocess
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+
+# Inside an already-activated venv the interpreter is usable directly;
+# `uv run` would only re-resolve the lockfile.
+IN_VENV = sys.prefix != sys.base_prefix
+
+
+class TidevicePipe:
+    """Client side of the helper: sends JSON requests and reads JSON replies."""
+
+    def __init__(self):
+        script = str(Path(__file__).resolve())
+        if IN_VENV:
+            cmd = [sys.executable, '-u', script]
+        else:
+            cmd = ['uv', 'run', 'python', '-u', script]
+
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            encoding='utf-8',
+            errors='replace',
+            cwd=Path(__file__).parent
+        )
+        atexit.register(self.close)
+
+    def alive(self):
+        """Check whether the helper process is still running."""
+        return self.process.poll() is None
+
+    def call(self, op, timeout=None, **kwargs):
+        """
+        Run an operation in the helper process.
+
+        Args:
+            op: Operation name (list, info, run, test_connection)
+            timeout: Seconds to wait for the reply, or None to wait forever
+            **kwargs: Operation arguments
+
+        Returns:
+            The operation result
+        """
+        self.process.stdin.write(json.dumps({'op': op, **kwargs}) + '\n')
+        self.process.stdin.flush()
+
+        if timeout is not None:
+            ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+            if not ready:
+                # The helper is still busy; a late reply would desync the pipe
+                self.process.kill()
+                raise TimeoutError(f"tidevice helper did not answer '{op}' within {timeout}s")
+
+        line = self.process.stdout.readline()
+        if not line:
+            raise RuntimeError("tidevice helper exited unexpectedly")
+
+        reply = json.loads(line)
+        if reply.get('output'):
+            print(reply['output'], end='')
+        if not reply['ok']:
+            raise RuntimeError(reply['error'])
+        return reply['result']
+
+    def close(self):
+        """Stop the helper process."""
+        if self.alive():
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+_pipe = None
+
+
+def get_pipe():
+    """Get the shared helper, starting it on first use or after it died."""
+    global _pipe
+    if _pipe is None or not _pipe.alive():
+        _pipe = TidevicePipe()
+    return _pipe
+
+
+# Helper process side
+
+# Device handles stay open for the helper's lifetime so the usbmux
+# connection and lockdown pairing are set up once per device
+devices = {}
+
+
+def get_device(udid=None):
+    """Get the cached device handle, creating it on first use."""
+    if udid not in devices:
+        import tidevice
+        devices[udid] = tidevice.Device(udid)
+    return devices[udid]
+
+
+def op_list():
+    """List connected devices, caching their handles and dropping unplugged ones."""
+    import tidevice
+    connected = {device.udid: device for device in tidevice.Device.list()}
+    for udid in [udid for udid in devices if udid is not None and udid not in connected]:
+        del devices[udid]
+    for udid, device in connected.items():
+        devices.setdefault(udid, device)
+    return list(connected)
+
+
+def op_info(udid=None):
+    """Get lockdown info for a device."""
+    return get_device(udid).device_info()
+
+
+def op_run(args):
+    """Run a tidevice CLI command in-process and capture its output."""
+    from tidevice.__main__ import main as tidevice_main
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    argv = sys.argv
+    sys.argv = ['tidevice', *args]
+    returncode = 0
+    try:
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            tidevice_main()
+    except SystemExit as e:
+        returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception as e:
+        returncode = 1
+        stderr.write(str(e))
+    finally:
+        sys.argv = argv
+
+    return {'returncode': returncode, 'stdout': stdout.getvalue(), 'stderr': stderr.getvalue()}
+
+
+def op_test_connection(usb=True, device=None):
+    """Connect to WebDriverAgent with iOS MCP and return the device info."""
+    from src.ios import IOSDevice
+    ios_device = IOSDevice(device=device, usb=usb, auto_setup=False)
+    try:
+        return ios_device.get_device_info()
+    finally:
+        # The pipe is long-lived: release the HTTP pools and any wdaproxy started for this check
+        ios_device.close()
+
+
+OPERATIONS = {
+    'list': op_list,
+    'info': op_info,
+    'run': op_run,
+    'test_connection': op_test_connection,
+}
+
+
+def serve():
+    """Answer JSON requests from stdin until it is closed."""
+    out = sys.stdout
+    for line in sys.stdin:
+        request = json.loads(line)
+        operation = OPERATIONS.get(request.pop('op', None))
+        log = io.StringIO()
+        try:
+            if operation is None:
+                raise ValueError("Unsupported operation")
+            with redirect_stdout(log):
+                result = operation(**request)
+            reply = {'ok': True, 'result': result, 'output': log.getvalue()}
+        except Exception as e:
+            reply = {'ok': False, 'error': str(e), 'output': log.getvalue()}
+
+        out.write(json.dumps(reply, default=str) + '\n')
+        out.flush()
+
+
+if __name__ == "__main__":
+    serve()
@@ -11,9 +11,17 @@ import subprocess
 import socket
 import requests
 import platform
+import re
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
 from pathlib import Path
 
 
+# `xcrun simctl list devices booted` lines: "-- iOS 17.0 --" and "    iPhone 15 (UDID) (Booted)"
+SIMCTL_RUNTIME_RE = re.compile(r'^-- (.+) --$')
+SIMCTL_DEVICE_RE = re.compile(r'^\s+(.+?) \([0-9A-Fa-f-]{36}\) \(Booted\)')
+
+
 def print_status(message):
     print(f"✅ {message}")
 
@@ -76,10 +84,10 @@ def check_dependencies():
     missing_modules = []
     
     for module in required_modules:
-        try:
-            __import__(module)
+        # find_spec locates the module without running its import-time code
+        if find_spec(module) is not None:
             print_status(f"{module} is installed")
-        except ImportError:
+        else:
             missing_modules.append(module)
             print_warning(f"{module} is missing")
     
@@ -113,19 +121,22 @@ def check_devices():
     
     # Check for iOS Simulators
     try:
+        # Let simctl filter to booted devices instead of parsing every runtime's JSON
         result = subprocess.run(
-            ["xcrun", "simctl", "list", "devices", "--json"],
+            ["xcrun", "simctl", "list", "devices", "booted"],
             capture_output=True, text=True, check=True
         )
         
-        import json
-        data = json.loads(result.stdout)
-        
         booted_simulators = []
-        for runtime, devices in data.get("devices", {}).items():
-            for device in devices:
-                if device.get("state") == "Booted":
-                    booted_simulators.append(f"{device['name']} ({runtime})")
+        runtime = None
+        for line in result.stdout.splitlines():
+            header = SIMCTL_RUNTIME_RE.match(line)
+            if header:
+                runtime = header.group(1)
+                continue
+            device = SIMCTL_DEVICE_RE.match(line)
+            if device:
+                booted_simulators.append(f"{device.group(1)} ({runtime})")
         
         if booted_simulators:
             print_status("Running iOS Simulators found:")
@@ -143,23 +154,39 @@ def check_devices():
     return devices_found
 
 
+def _probe_wda_port(port):
+    """Return the /status payload if WebDriverAgent answers on port, else None."""
+    response = requests.get(f"http://localhost:{port}/status", timeout=3)
+    if response.status_code == 200:
+        return response.json()
+    return None
+
+
 def check_webdriveragent(ports=[8100, 4723, 8200, 9100]):
     """Check if WebDriverAgent is running on common ports."""
     print("\n🔍 Checking WebDriverAgent status...")
     
-    for port in ports:
-        try:
-            response = requests.get(f"http://localhost:{port}/status", timeout=3)
-            if response.status_code == 200:
-                print_status(f"WebDriverAgent is running on port {port}")
-                data = response.json()
-                if 'ios' in data:
-                    ios_info = data['ios']
-                    print_info(f"  Device: {ios_info.get('name', 'Unknown')}")
-                    print_info(f"  iOS Version: {ios_info.get('version', 'Unknown')}")
-                return port
-        except requests.exceptions.RequestException:
-            continue
+    # Probe every port at once so a missing WDA costs one timeout, not one per port
+    executor = ThreadPoolExecutor(max_workers=len(ports))
+    try:
+        probes = [(port, executor.submit(_probe_wda_port, port)) for port in ports]
+        # Report the first answering port in ports order, not whichever replied first
+        for port, probe in probes:
+            try:
+                data = probe.result()
+            except (requests.exceptions.RequestException, ValueError):
+                continue
+            if data is None:
+                continue
+            
+            print_status(f"WebDriverAgent is running on port {port}")
+            if 'ios' in data:
+                ios_info = data['ios']
+                print_info(f"  Device: {ios_info.get('name', 'Unknown')}")
+                print_info(f"  iOS Version: {ios_info.get('version', 'Unknown')}")
+            return port
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
     
     print_warning("WebDriverAgent is not running on any common ports")
     return None
@@ -10,15 +10,19 @@ and AppleScript automation similar to Android/iOS MCP servers.
 from mcp.server.fastmcp import FastMCP, Image
 from contextlib import asynccontextmanager
 from argparse import ArgumentParser
-from src.mac import MacDevice
 from textwrap import dedent
 import asyncio
+import threading
+import time
+import uuid
 
 
 parser = ArgumentParser()
 parser.add_argument('--device-name', type=str, help='Mac device name for identification')
 parser.add_argument('--enable-accessibility', action='store_true', help='Enable accessibility features for automation')
 parser.add_argument('--safe-mode', action='store_true', help='Run in safe mode with restricted system operations')
+parser.add_argument('--applescript-cache-dir', type=str, help='Directory for compiled AppleScripts (default: ~/Library/Caches/mac-mcp/applescript)')
+parser.add_argument('--no-applescript-cache', action='store_true', help='Run AppleScripts from source every time instead of caching compiled scripts')
 parser.add_argument('--log-level', type=str, default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
 args = parser.parse_args()
 
@@ -31,258 +35,349 @@ and AppleScript automation for complete desktop automation workflows.
 @asynccontextmanager
 async def lifespan(app: FastMCP):
     """Runs initialization code before the server starts and cleanup code after it shuts down."""
-    await asyncio.sleep(1)  # Simulate startup latency
+    # Nothing to wait for: the Mac device is set up on the first tool call
     yield
 
-mcp = FastMCP(name="Mac-MCP", instructions=instructions)
-
-# Initialize Mac device
-mac_device = MacDevice(
-    device_name=args.device_name or "Local Mac",
-    enable_accessibility=args.enable_accessibility,
-    safe_mode=args.safe_mode,
-    log_level=args.log_level
-)
+mcp = FastMCP(name="Mac-MCP", instructions=instructions, lifespan=lifespan)
+
+# Mac device, created on the first tool call so starting the server and
+# listing tools never pays for importing PyObjC/Pillow or device setup
+mac_device = None
+_device_lock = threading.Lock()
+
+def get_device():
+    """Get the shared Mac device, initializing it on first use."""
+    global mac_device
+    if mac_device is None:
+        with _device_lock:
+            if mac_device is None:
+                from src.mac import MacDevice
+                mac_device = MacDevice(
+                    device_name=args.device_name or "Local Mac",
+                    enable_accessibility=args.enable_accessibility,
+                    safe_mode=args.safe_mode,
+                    log_level=args.log_level,
+                    applescript_cache_dir=args.applescript_cache_dir,
+                    applescript_cache=not args.no_applescript_cache
+                )
+    return mac_device
+
+# Caps on concurrent blocking calls per kind of work. Input events must not
+# interleave; the others bound how many osascript/shell processes can fan out.
+_LIMITS = {
+    'ui': asyncio.Semaphore(1),
+    'applescript': asyncio.Semaphore(4),
+    'shell': asyncio.Semaphore(8),
+    'system': asyncio.Semaphore(16),
+}
+
+def _invoke_device(method: str, args: tuple, kwargs: dict):
+    """Call a MacDevice method by name; runs on a worker thread, so first use may create the device."""
+    return getattr(get_device(), method)(*args, **kwargs)
+
+async def run_blocking(category: str, func, *args, **kwargs):
+    """Run a blocking function on a worker thread so other tool calls keep being served."""
+    async with _LIMITS[category]:
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+async def call_device(category: str, method: str, *args, **kwargs):
+    """Call a MacDevice method off the event loop, within its category's limit."""
+    return await run_blocking(category, _invoke_device, method, args, kwargs)
 
 @mcp.tool(name='System-Info-Tool', description='Get comprehensive system information')
-def system_info_tool():
+async def system_info_tool():
     """Get comprehensive Mac system information."""
-    info = mac_device.get_system_info()
-    return info
+    return await call_device('system', 'get_system_info')
 
-@mcp.tool('State-Tool', description='Get the current state of the Mac desktop. Optionally includes visual screenshot when use_vision=True.')
-def state_tool(use_vision: bool = False):
+@mcp.tool('State-Tool', description='Get the current state of the Mac desktop. Optionally includes visual screenshot when use_vision=True. Set use_ui_tree=False with use_vision=True for a fast screenshot-only state that skips element discovery.')
+async def state_tool(use_vision: bool = False, use_ui_tree: bool = True):
     """Get the current state of the Mac desktop with optional screenshot."""
-    mac_state = mac_device.get_state(use_vision=use_vision)
-    result = [mac_state.desktop_state.to_string()]
-    if use_vision and mac_state.screenshot:
-        result.append(Image(data=mac_state.screenshot, format='PNG'))
-    return result
+    if not use_vision and not use_ui_tree:
+        return '❌ Nothing to return: enable use_vision and/or use_ui_tree'
+    
+    def get_state():
+        mac_state = get_device().get_state(use_vision=use_vision, use_ui_tree=use_ui_tree)
+        result = [mac_state.desktop_state.to_string()] if use_ui_tree else []
+        if use_vision and mac_state.screenshot:
+            result.append(Image(data=mac_state.screenshot, format='PNG'))
+        return result
+    
+    return await run_blocking('system', get_state)
 
 @mcp.tool(name='Click-Tool', description='Click on specific coordinates on the desktop')
-def click_tool(x: int, y: int, click_type: str = 'left', double_click: bool = False):
+async def click_tool(x: int, y: int, click_type: str = 'left', double_click: bool = False):
     """
     Click on specific coordinates on the Mac desktop.
     Click types: left, right, middle
     """
-    result = mac_device.click(x, y, click_type=click_type, double_click=double_click)
-    return result
+    return await call_device('ui', 'click', x, y, click_type=click_type, double_click=double_click)
 
 @mcp.tool(name='Element-Click-Tool', description='Click on UI elements by accessibility properties')
-def element_click_tool(element_type: str, identifier: str, app_name: str = None, timeout: float = 10.0):
+async def element_click_tool(element_type: str, identifier: str, app_name: str = None, timeout: float = 10.0):
     """
     Click on UI elements using accessibility properties.
     Element types: button, menu, menuitem, checkbox, radiobutton, textfield, link, etc.
     """
-    result = mac_device.click_element(element_type, identifier, app_name=app_name, timeout=timeout)
-    return result
+    return await call_device('ui', 'click_element', element_type, identifier, app_name=app_name, timeout=timeout)
 
 @mcp.tool(name='Type-Tool', description='Type text at current cursor position or coordinates')
-def type_tool(text: str, x: int = None, y: int = None, clear: bool = False):
+async def type_tool(text: str, x: int = None, y: int = None, clear: bool = False):
     """Type text at current cursor position or click coordinates first."""
-    result = mac_device.type_text(text, x=x, y=y, clear=clear)
-    return result
+    return await call_device('ui', 'type_text', text, x=x, y=y, clear=clear)
 
 @mcp.tool(name='Element-Type-Tool', description='Type text in specific UI elements')
-def element_type_tool(element_type: str, identifier: str, text: str, app_name: str = None, clear: bool = True, timeout: float = 10.0):
+async def element_type_tool(element_type: str, identifier: str, text: str, app_name: str = None, clear: bool = True, timeout: float = 10.0):
     """Type text in specific UI elements using accessibility properties."""
-    result = mac_device.type_in_element(element_type, identifier, text, app_name=app_name, clear=clear, timeout=timeout)
-    return result
+    return await call_device('ui', 'type_in_element', element_type, identifier, text, app_name=app_name, clear=clear, timeout=timeout)
 
 @mcp.tool(name='Key-Press-Tool', description='Send keyboard shortcuts and key combinations')
-def key_press_tool(keys: str, modifier_keys: str = None):
+async def key_press_tool(keys: str, modifier_keys: str = None):
     """
     Send keyboard shortcuts and key combinations.
     Keys: any keyboard key (a-z, 0-9, space, return, tab, escape, etc.)
     Modifier keys: cmd, shift, ctrl, alt, fn (comma-separated)
     """
-    result = mac_device.send_keys(keys, modifier_keys=modifier_keys)
-    return result
+    return await call_device('ui', 'send_keys', keys, modifier_keys=modifier_keys)
 
 @mcp.tool(name='Mouse-Drag-Tool', description='Perform mouse drag operations')
-def mouse_drag_tool(start_x: int, start_y: int, end_x: int, end_y: int, duration: float = 1.0):
+async def mouse_drag_tool(start_x: int, start_y: int, end_x: int, end_y: int, duration: float = 1.0):
     """Perform mouse drag from start coordinates to end coordinates."""
-    result = mac_device.drag(start_x, start_y, end_x, end_y, duration=duration)
-    return result
+    return await call_device('ui', 'drag', start_x, start_y, end_x, end_y, duration=duration)
 
 @mcp.tool(name='Scroll-Tool', description='Scroll in specified direction')
-def scroll_tool(direction: str, amount: int = 5, x: int = None, y: int = None):
+async def scroll_tool(direction: str, amount: int = 5, x: int = None, y: int = None):
     """
     Scroll in specified direction.
     Directions: up, down, left, right
     Amount: number of scroll units
     """
-    result = mac_device.scroll(direction, amount=amount, x=x, y=y)
-    return result
+    return await call_device('ui', 'scroll', direction, amount=amount, x=x, y=y)
 
 @mcp.tool(name='App-Control-Tool', description='Control Mac applications')
-def app_control_tool(action: str, app_name: str, window_title: str = None):
+async def app_control_tool(action: str, app_name: str, window_title: str = None):
     """
     Control Mac applications.
     Actions: launch, quit, activate, hide, minimize, maximize, close
     """
-    result = mac_device.app_control(action, app_name, window_title=window_title)
-    return result
+    return await call_device('applescript', 'app_control', action, app_name, window_title=window_title)
 
 @mcp.tool(name='App-List-Tool', description='List running applications and their windows')
-def app_list_tool(running_only: bool = True):
+async def app_list_tool(running_only: bool = True):
     """List running applications and their windows."""
-    result = mac_device.list_applications(running_only=running_only)
-    return result
+    return await call_device('system', 'list_applications', running_only=running_only)
 
 @mcp.tool(name='Window-Control-Tool', description='Control application windows')
-def window_control_tool(action: str, window_title: str = None, app_name: str = None, x: int = None, y: int = None, width: int = None, height: int = None):
+async def window_control_tool(action: str, window_title: str = None, app_name: str = None, x: int = None, y: int = None, width: int = None, height: int = None):
     """
     Control application windows.
     Actions: activate, minimize, maximize, close, resize, move, fullscreen
     """
-    result = mac_device.window_control(action, window_title=window_title, app_name=app_name, x=x, y=y, width=width, height=height)
-    return result
+    return await call_device('applescript', 'window_control', action, window_title=window_title, app_name=app_name, x=x, y=y, width=width, height=height)
 
 @mcp.tool(name='AppleScript-Tool', description='Execute AppleScript commands')
-def applescript_tool(script: str, timeout: float = 30.0):
+async def applescript_tool(script: str, timeout: float = 30.0):
     """Execute AppleScript commands for advanced Mac automation."""
-    result = mac_device.execute_applescript(script, timeout=timeout)
-    return result
+    return await call_device('applescript', 'execute_applescript', script, timeout=timeout)
 
 @mcp.tool(name='Shell-Command-Tool', description='Execute shell commands with safety restrictions')
-def shell_command_tool(command: str, timeout: float = 30.0, safe_mode: bool = True):
+async def shell_command_tool(command: str, timeout: float = 30.0, safe_mode: bool = True):
     """Execute shell commands with optional safety restrictions."""
-    result = mac_device.execute_shell_command(command, timeout=timeout, safe_mode=safe_mode)
-    return result
+    return await call_device('shell', 'execute_shell_command', command, timeout=timeout, safe_mode=safe_mode)
+
+# Seconds a finished job's result is kept for Poll-Job-Tool before it is evicted
+JOB_RESULT_TTL = 600.0
+# Background AppleScript/shell jobs by id; a job is dropped once its result is
+# reported, or JOB_RESULT_TTL after it finished if nobody polls it
+jobs: dict[str, asyncio.Task] = {}
+# Job id -> monotonic time its task finished, for jobs still waiting to be polled
+_job_finished_at: dict[str, float] = {}
+
+def _evict_stale_jobs():
+    """Forget finished jobs whose results were not polled within JOB_RESULT_TTL."""
+    cutoff = time.monotonic() - JOB_RESULT_TTL
+    for job_id in [job_id for job_id, finished_at in _job_finished_at.items() if finished_at <= cutoff]:
+        del _job_finished_at[job_id]
+        task = jobs.pop(job_id, None)
+        if task is not None and not task.cancelled():
+            task.exception()  # Mark an unread failure as retrieved so asyncio does not log it
+
+def _start_job(category: str, method: str, *args, **kwargs) -> str:
+    """Start a device call in the background and return its job id."""
+    _evict_stale_jobs()
+    job_id = uuid.uuid4().hex[:12]
+    task = asyncio.create_task(call_device(category, method, *args, **kwargs))
+    
+    def record_finish(_):
+        if job_id in jobs:  # Not already polled or cancelled
+            _job_finished_at[job_id] = time.monotonic()
+    
+    task.add_done_callback(record_finish)
+    jobs[job_id] = task
+    return job_id
+
+@mcp.tool(name='Start-AppleScript-Tool', description='Start an AppleScript in the background and return a job id for Poll-Job-Tool')
+async def start_applescript_tool(script: str, timeout: float = 300.0):
+    """Start a long-running AppleScript without holding the request open."""
+    return _start_job('applescript', 'execute_applescript', script, timeout=timeout)
+
+@mcp.tool(name='Start-Shell-Command-Tool', description='Start a shell command in the background and return a job id for Poll-Job-Tool')
+async def start_shell_command_tool(command: str, timeout: float = 300.0, safe_mode: bool = True):
+    """Start a long-running shell command without holding the request open."""
+    return _start_job('shell', 'execute_shell_command', command, timeout=timeout, safe_mode=safe_mode)
+
+@mcp.tool(name='Poll-Job-Tool', description='Check a background job without waiting for it')
+async def poll_job_tool(job_id: str):
+    """
+    Check a background job started by a Start-* tool.
+    Status: pending, done, error, cancelled (result is set when done)
+    """
+    task = jobs.get(job_id)
+    if task is None:
+        return {'status': 'error', 'error': f'Unknown job id: {job_id}'}
+    if not task.done():
+        return {'status': 'pending'}
+    
+    del jobs[job_id]
+    _job_finished_at.pop(job_id, None)
+    if task.cancelled():
+        return {'status': 'cancelled'}
+    if task.exception() is not None:
+        return {'status': 'error', 'error': str(task.exception())}
+    return {'status': 'done', 'result': task.result()}
+
+@mcp.tool(name='Cancel-Job-Tool', description='Cancel a background job. A script or command that already started keeps running until its own timeout, but stops counting against the AppleScript/shell concurrency limit.')
+async def cancel_job_tool(job_id: str):
+    """
+    Cancel a background job and forget it.
+    A script or command that already started keeps running until its own timeout.
+    Its category slot is released at once, so until it exits more processes of
+    that category than the limit allows can be running.
+    """
+    task = jobs.pop(job_id, None)
+    _job_finished_at.pop(job_id, None)
+    if task is None:
+        return f'Unknown job id: {job_id}'
+    task.cancel()
+    return f'Cancelled job {job_id}'
 
 @mcp.tool(name='File-Operations-Tool', description='Perform file and directory operations')
-def file_operations_tool(action: str, source_path: str, destination_path: str = None, recursive: bool = False):
+async def file_operations_tool(action: str, source_path: str, destination_path: str = None, recursive: bool = False):
     """
     Perform file and directory operations.
     Actions: copy, move, delete, create_dir, list, exists, info
     """
-    result = mac_device.file_operations(action, source_path, destination_path=destination_path, recursive=recursive)
-    return result
+    return await call_device('system', 'file_operations', action, source_path, destination_path=destination_path, recursive=recursive)
 
 @mcp.tool(name='Finder-Tool', description='Control Finder application and file browser')
-def finder_tool(action: str, path: str = None, view_style: str = None):
+async def finder_tool(action: str, path: str = None, view_style: str = None):
     """
     Control Finder application and file browser.
     Actions: open, new_window, go_to, set_view, get_selection, refresh
     View styles: icon, list, column, gallery
     """
-    result = mac_device.finder_control(action, path=path, view_style=view_style)
-    return result
+    return await call_device('applescript', 'finder_control', action, path=path, view_style=view_style)
 
 @mcp.tool(name='Clipboard-Tool', description='Manage system clipboard')
-def clipboard_tool(action: str, content: str = None, content_type: str = 'text'):
+async def clipboard_tool(action: str, content: str = None, content_type: str = 'text'):
     """
     Manage system clipboard.
     Actions: get, set, clear
     Content types: text, image, file
     """
-    result = mac_device.clipboard_management(action, content=content, content_type=content_type)
-    return result
+    return await call_device('system', 'clipboard_management', action, content=content, content_type=content_type)
 
 @mcp.tool(name='Notification-Tool', description='Send and manage Mac notifications')
-def notification_tool(action: str, title: str = None, message: str = None, app_name: str = None):
+async def notification_tool(action: str, title: str = None, message: str = None, app_name: str = None):
     """
     Send and manage Mac notifications.
     Actions: send, clear, list
     """
-    result = mac_device.notification_management(action, title=title, message=message, app_name=app_name)
-    return result
+    return await call_device('system', 'notification_management', action, title=title, message=message, app_name=app_name)
 
 @mcp.tool(name='System-Preferences-Tool', description='Control System Preferences/Settings')
-def system_preferences_tool(action: str, pane: str = None, setting: str = None, value: str = None):
+async def system_preferences_tool(action: str, pane: str = None, setting: str = None, value: str = None):
     """
     Control System Preferences/Settings.
     Actions: open, get_setting, set_setting, list_panes
     """
-    result = mac_device.system_preferences_control(action, pane=pane, setting=setting, value=value)
-    return result
+    return await call_device('system', 'system_preferences_control', action, pane=pane, setting=setting, value=value)
 
 @mcp.tool(name='Dock-Tool', description='Control Mac Dock')
-def dock_tool(action: str, app_name: str = None, position: str = None):
+async def dock_tool(action: str, app_name: str = None, position: str = None):
     """
     Control Mac Dock.
     Actions: add_app, remove_app, set_position, set_autohide, get_apps
     Positions: bottom, left, right
     """
-    result = mac_device.dock_control(action, app_name=app_name, position=position)
-    return result
+    return await call_device('applescript', 'dock_control', action, app_name=app_name, position=position)
 
 @mcp.tool(name='Menu-Bar-Tool', description='Interact with menu bar and menu items')
-def menu_bar_tool(action: str, menu_name: str = None, item_name: str = None, app_name: str = None):
+async def menu_bar_tool(action: str, menu_name: str = None, item_name: str = None, app_name: str = None):
     """
     Interact with menu bar and menu items.
     Actions: click_menu, get_menus, get_menu_items
     """
-    result = mac_device.menu_bar_interaction(action, menu_name=menu_name, item_name=item_name, app_name=app_name)
-    return result
+    return await call_device('applescript', 'menu_bar_interaction', action, menu_name=menu_name, item_name=item_name, app_name=app_name)
 
 @mcp.tool(name='Screenshot-Tool', description='Take screenshots of desktop or specific areas')
-def screenshot_tool(save_path: str = None, x: int = None, y: int = None, width: int = None, height: int = None, window_id: str = None):
+async def screenshot_tool(save_path: str = None, x: int = None, y: int = None, width: int = None, height: int = None, window_id: str = None):
     """
     Take screenshots of desktop or specific areas.
     Coordinates define capture region, window_id captures specific window.
     """
-    result = mac_device.take_screenshot(save_path=save_path, x=x, y=y, width=width, height=height, window_id=window_id)
-    return result
+    return await call_device('system', 'take_screenshot', save_path=save_path, x=x, y=y, width=width, height=height, window_id=window_id)
 
 @mcp.tool(name='Process-Tool', description='Manage system processes')
-def process_tool(action: str, process_name: str = None, pid: int = None):
+async def process_tool(action: str, process_name: str = None, pid: int = None):
     """
     Manage system processes.
     Actions: list, kill, info, cpu_usage, memory_usage
     """
-    result = mac_device.process_management(action, process_name=process_name, pid=pid)
-    return result
+    return await call_device('system', 'process_management', action, process_name=process_name, pid=pid)
 
 @mcp.tool(name='Network-Tool', description='Get network information and control network settings')
-def network_tool(action: str, interface: str = None, setting: str = None, value: str = None):
+async def network_tool(action: str, interface: str = None, setting: str = None, value: str = None):
     """
     Get network information and control network settings.
     Actions: list_interfaces, get_info, wifi_scan, connect_wifi, disconnect_wifi
     """
-    result = mac_device.network_management(action, interface=interface, setting=setting, value=value)
-    return result
+    return await call_device('system', 'network_management', action, interface=interface, setting=setting, value=value)
 
 @mcp.tool(name='Volume-Tool', description='Control system volume and audio')
-def volume_tool(action: str, level: int = None, device: str = None):
+async def volume_tool(action: str, level: int = None, device: str = None):
     """
     Control system volume and audio.
     Actions: get_volume, set_volume, mute, unmute, list_devices
     Level: 0-100 for volume level
     """
-    result = mac_device.volume_control(action, level=level, device=device)
-    return result
+    return await call_device('system', 'volume_control', action, level=level, device=device)
 
 @mcp.tool(name='Display-Tool', description='Control display settings and resolution')
-def display_tool(action: str, display_id: int = None, resolution: str = None, brightness: int = None):
+async def display_tool(action: str, display_id: int = None, resolution: str = None, brightness: int = None):
     """
     Control display settings and resolution.
     Actions: list_displays, get_resolution, set_resolution, get_brightness, set_brightness
     Resolution format: WIDTHxHEIGHT (e.g., 1920x1080)
     Brightness: 0-100
     """
-    result = mac_device.display_control(action, display_id=display_id, resolution=resolution, brightness=brightness)
-    return result
+    return await call_device('system', 'display_control', action, display_id=display_id, resolution=resolution, brightness=brightness)
 
 @mcp.tool(name='Accessibility-Tool', description='Control accessibility features and settings')
-def accessibility_tool(action: str, feature: str = None, enabled: bool = None):
+async def accessibility_tool(action: str, feature: str = None, enabled: bool = None):
     """
     Control accessibility features and settings.
     Actions: list_features, get_feature, set_feature, check_permissions
     Features: voice_over, zoom, switch_control, etc.
     """
-    result = mac_device.accessibility_control(action, feature=feature, enabled=enabled)
-    return result
+    return await call_device('system', 'accessibility_control', action, feature=feature, enabled=enabled)
 
 @mcp.tool(name='Wait-Tool', description='Wait for specified duration or conditions')
-def wait_tool(duration: float = None, condition: str = None, element_type: str = None, identifier: str = None, timeout: float = 30.0):
+async def wait_tool(duration: float = None, condition: str = None, element_type: str = None, identifier: str = None, timeout: float = 30.0):
     """
     Wait for specified duration or conditions.
     Conditions: element_appears, element_disappears, app_launches, app_quits
     """
-    result = mac_device.wait(duration=duration, condition=condition, element_type=element_type, identifier=identifier, timeout=timeout)
-    return result
+    return await call_device('system', 'wait', duration=duration, condition=condition, element_type=element_type, identifier=identifier, timeout=timeout)
 
 if __name__ == '__main__':
     mcp.run()
\ No newline at end of file
@@ -9,6 +9,8 @@ import os
 import sys
 import time
 import json
+import hashlib
+import tempfile
 import subprocess
 import logging
 from typing import Optional, Union, Dict, Any, List, Tuple
@@ -31,7 +33,33 @@ except ImportError:
     logging.warning("PyObjC not available. Some Mac automation features will be limited.")
 
 from src.mac.views import MacState
-from src.page import PageTree
+from src.page import PageState, PageTree
+
+DEFAULT_APPLESCRIPT_CACHE_DIR = os.path.expanduser("~/Library/Caches/mac-mcp/applescript")
+# Compiled scripts kept on disk; the least recently used are removed beyond this
+APPLESCRIPT_CACHE_SIZE = 500
+
+# libSystem handle for clonefile(2), loaded on the first copy
+_libc = None
+
+
+def _clonefile(source: str, destination: str) -> bool:
+    """
+    Copy a file with clonefile(2): an instant copy-on-write clone on APFS.
+    
+    Returns False when cloning isn't possible (other volume, non-APFS,
+    destination exists), so the caller can fall back to a regular copy.
+    """
+    global _libc
+    if sys.platform != 'darwin':
+        return False
+    try:
+        if _libc is None:
+            import ctypes
+            _libc = ctypes.CDLL('/usr/lib/libSystem.B.dylib', use_errno=True)
+        return _libc.clonefile(os.fsencode(source), os.fsencode(destination), 0) == 0
+    except (OSError, AttributeError):
+        return False
 
 
 class MacDevice:
@@ -42,7 +70,9 @@ class MacDevice:
         device_name: str = "Local Mac",
         enable_accessibility: bool = False,
         safe_mode: bool = False,
-        log_level: str = "INFO"
+        log_level: str = "INFO",
+        applescript_cache_dir: Optional[str] = None,
+        applescript_cache: bool = True
     ):
         """
         Initialize Mac device connection.
@@ -52,10 +82,16 @@ class MacDevice:
             enable_accessibility: Enable accessibility features for automation
             safe_mode: Run in safe mode with restricted system operations
             log_level: Logging level (DEBUG, INFO, WARNING, ERROR)
+            applescript_cache_dir: Where compiled AppleScripts are kept
+                (default: ~/Library/Caches/mac-mcp/applescript)
+            applescript_cache: Whether to compile repeated AppleScripts and reuse them
         """
         self.device_name = device_name
         self.enable_accessibility = enable_accessibility
         self.safe_mode = safe_mode
+        self.applescript_cache_dir = (applescript_cache_dir or DEFAULT_APPLESCRIPT_CACHE_DIR) if applescript_cache else None
+        # Source hashes run once so far; a script is only compiled when it repeats
+        self._applescripts_seen = set()
         
         # Setup logging
         logging.basicConfig(level=getattr(logging, log_level.upper()))
@@ -116,17 +152,33 @@ class MacDevice:
             self.logger.error(f"Failed to check accessibility permissions: {e}")
             return False
     
-    def get_state(self, use_vision: bool = False) -> 'MacState':
+    def get_state(self, use_vision: bool = False, use_ui_tree: bool = True) -> 'MacState':
         """
         Get current Mac desktop state with optional screenshot.
         
         Args:
-            use_vision: Whether to include annotated screenshot
+            use_vision: Whether to include a screenshot (annotated when the UI tree is read)
+            use_ui_tree: Whether to discover UI elements; False with use_vision
+                gives a plain screenshot without the accessibility walk
             
         Returns:
             MacState object containing desktop state and optional screenshot
         """
+        if not use_vision and not use_ui_tree:
+            raise ValueError("At least one of use_vision or use_ui_tree must be enabled")
+        
         try:
+            if not use_ui_tree:
+                # Screenshot-only fast path: skip element discovery entirely
+                desktop_state = PageState(
+                    title="Mac Desktop",
+                    url="Unknown",
+                    interactive_elements=[],
+                    page_info={}
+                )
+                screenshot = self.screenshot_in_bytes(self.get_screenshot())
+                return MacState(desktop_state=desktop_state, screenshot=screenshot)
+            
             page_tree = PageTree(self)
             desktop_state = page_tree.get_state()
             
@@ -879,12 +931,73 @@ class MacDevice:
         except Exception as e:
             return f"Error controlling window: {e}"
     
+    def _compiled_applescript(self, script: str) -> Optional[str]:
+        """
+        Get the path of the compiled form of script, compiling it the second time it runs.
+        
+        Scripts are keyed by the SHA-256 of their source, so an edited script
+        simply gets a new entry. Most scripts only ever run once, so the
+        first run skips osacompile. Returns None if caching is off, the script
+        is new, or compiling fails, in which case the caller runs the source directly.
+        """
+        if not self.applescript_cache_dir:
+            return None
+        
+        digest = hashlib.sha256(script.encode()).hexdigest()
+        path = os.path.join(self.applescript_cache_dir, digest + '.scpt')
+        temp_path = None
+        try:
+            if os.path.exists(path):
+                os.utime(path)  # Mark as recently used for eviction
+                return path
+            
+            if digest not in self._applescripts_seen:
+                if len(self._applescripts_seen) >= APPLESCRIPT_CACHE_SIZE:
+                    self._applescripts_seen.clear()
+                self._applescripts_seen.add(digest)
+                return None
+            
+            os.makedirs(self.applescript_cache_dir, exist_ok=True)
+            # Unique per call: worker threads may compile the same script at once
+            fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.applescript_cache_dir)
+            os.close(fd)
+            # Compiling resolves app dictionaries, which can stall on a hung app
+            result = subprocess.run(['osacompile', '-o', temp_path, '-e', script], capture_output=True, timeout=10)
+            if result.returncode != 0:
+                return None  # Let osascript report the syntax error
+            os.replace(temp_path, path)
+            temp_path = None
+            self._applescripts_seen.discard(digest)
+            self._evict_compiled_applescripts()
+            return path
+        except (OSError, subprocess.TimeoutExpired) as e:
+            self.logger.debug(f"AppleScript cache unavailable: {e}")
+            return None
+        finally:
+            if temp_path:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+    
+    def _evict_compiled_applescripts(self):
+        """Remove the least recently used compiled scripts beyond APPLESCRIPT_CACHE_SIZE."""
+        entries = [entry for entry in os.scandir(self.applescript_cache_dir) if entry.name.endswith('.scpt')]
+        if len(entries) <= APPLESCRIPT_CACHE_SIZE:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - APPLESCRIPT_CACHE_SIZE]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+    
     def execute_applescript(self, script: str, timeout: float = 30.0) -> str:
         """Execute AppleScript commands for advanced Mac automation."""
         try:
-            result = subprocess.run([
-                'osascript', '-e', script
-            ], capture_output=True, text=True, timeout=timeout)
+            compiled = self._compiled_applescript(script)
+            command = ['osascript', compiled] if compiled else ['osascript', '-e', script]
+            result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
             
             if result.returncode == 0:
                 return f"AppleScript executed successfully. Output: {result.stdout.strip()}"
@@ -936,6 +1049,17 @@ class MacDevice:
         except Exception as e:
             return f"Error executing command: {e}"
     
+    def _copy_file(self, source_path: str, destination_path: str) -> str:
+        """Copy one file like shutil.copy2, cloning it instead when the volume allows."""
+        import shutil
+        
+        if os.path.isdir(destination_path):
+            destination_path = os.path.join(destination_path, os.path.basename(source_path))
+        if _clonefile(source_path, destination_path):
+            return destination_path
+        # copy2 already uses fcopyfile(3) on macOS for the data and metadata
+        return shutil.copy2(source_path, destination_path)
+    
     def file_operations(self, action: str, source_path: str, destination_path: str = None, recursive: bool = False) -> str:
         """Perform file and directory operations."""
         try:
@@ -951,12 +1075,12 @@ class MacDevice:
                 
                 if os.path.isdir(source_path):
                     if recursive:
-                        shutil.copytree(source_path, destination_path)
+                        shutil.copytree(source_path, destination_path, copy_function=self._copy_file)
                         return f"Directory copied from {source_path} to {destination_path}"
                     else:
                         return "Use recursive=True to copy directories"
                 else:
-                    shutil.copy2(source_path, destination_path)
+                    self._copy_file(source_path, destination_path)
                     return f"File copied from {source_path} to {destination_path}"
             
             elif action == 'move':
@@ -0,0 +1,101 @@
+import unittest
+import asyncio
+import os
+import sys
+import threading
+from unittest.mock import Mock, patch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# main.py parses the command line at import time
+with patch.object(sys, 'argv', ['main.py']):
+    import main
+
+
+class TestBackgroundJobs(unittest.TestCase):
+    """Lifecycle of jobs started by the Start-* tools"""
+
+    def setUp(self):
+        self.device = Mock()
+        main.mac_device = self.device
+        main.jobs.clear()
+        main._job_finished_at.clear()
+
+    def tearDown(self):
+        main.mac_device = None
+        main.jobs.clear()
+        main._job_finished_at.clear()
+
+    def run_async(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_job_reports_pending_then_result_once(self):
+        release = threading.Event()
+        self.device.execute_applescript.side_effect = lambda script, timeout: release.wait(5) and 'finished'
+
+        async def scenario():
+            job_id = await main.start_applescript_tool('delay 1')
+            pending = await main.poll_job_tool(job_id)
+            release.set()
+            await main.jobs[job_id]
+            done = await main.poll_job_tool(job_id)
+            forgotten = await main.poll_job_tool(job_id)
+            return pending, done, forgotten
+
+        pending, done, forgotten = self.run_async(scenario())
+        self.assertEqual(pending, {'status': 'pending'})
+        self.assertEqual(done, {'status': 'done', 'result': 'finished'})
+        self.assertEqual(forgotten['status'], 'error')
+        self.device.execute_applescript.assert_called_once_with('delay 1', timeout=300.0)
+
+    def test_failed_job_reports_error(self):
+        self.device.execute_shell_command.side_effect = RuntimeError('boom')
+
+        async def scenario():
+            job_id = await main.start_shell_command_tool('sleep 1')
+            await asyncio.gather(main.jobs[job_id], return_exceptions=True)
+            return await main.poll_job_tool(job_id)
+
+        self.assertEqual(self.run_async(scenario()), {'status': 'error', 'error': 'boom'})
+
+    def test_cancelled_job_is_forgotten(self):
+        release = threading.Event()
+        self.device.execute_shell_command.side_effect = lambda *args, **kwargs: release.wait(5)
+
+        async def scenario():
+            job_id = await main.start_shell_command_tool('sleep 60')
+            message = await main.cancel_job_tool(job_id)
+            release.set()
+            return job_id, message, await main.poll_job_tool(job_id)
+
+        job_id, message, poll = self.run_async(scenario())
+        self.assertEqual(message, f'Cancelled job {job_id}')
+        self.assertEqual(poll, {'status': 'error', 'error': f'Unknown job id: {job_id}'})
+        self.assertEqual(main.jobs, {})
+
+    @patch('main.time.monotonic')
+    def test_unpolled_finished_job_is_evicted(self, monotonic):
+        monotonic.return_value = 100.0
+        self.device.execute_shell_command.return_value = 'done'
+        self.device.execute_applescript.return_value = 'done'
+
+        async def scenario():
+            stale = await main.start_shell_command_tool('true')
+            await main.jobs[stale]
+            await asyncio.sleep(0)  # Let the done callback record the finish time
+            monotonic.return_value = 100.0 + main.JOB_RESULT_TTL
+            fresh = await main.start_applescript_tool('return 1')
+            await main.jobs[fresh]
+            return stale, fresh
+
+        stale, fresh = self.run_async(scenario())
+        self.assertEqual(list(main.jobs), [fresh])
+        self.assertNotIn(stale, main._job_finished_at)
+
+    def test_unknown_job_id(self):
+        self.assertEqual(self.run_async(main.cancel_job_tool('missing')), 'Unknown job id: missing')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import Mock, patch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.mac import MacDevice
+
+
+class TestCompiledAppleScriptCache(unittest.TestCase):
+    """Compiling AppleScripts only once they repeat"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        with patch.object(MacDevice, '_initialize_system'):
+            self.device = MacDevice(applescript_cache_dir=self.cache_dir.name)
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    @patch('src.mac.subprocess.run')
+    def test_first_run_skips_osacompile(self, run):
+        self.assertIsNone(self.device._compiled_applescript('return 1'))
+        run.assert_not_called()
+
+    @patch('src.mac.subprocess.run')
+    def test_repeat_is_compiled_once_then_reused(self, run):
+        run.return_value = Mock(returncode=0)
+        self.device._compiled_applescript('return 1')
+
+        path = self.device._compiled_applescript('return 1')
+        self.assertTrue(path and os.path.exists(path))
+        self.assertEqual(run.call_count, 1)
+        self.assertEqual(run.call_args.args[0][0], 'osacompile')
+
+        self.assertEqual(self.device._compiled_applescript('return 1'), path)
+        self.assertEqual(run.call_count, 1)
+
+    @patch('src.mac.subprocess.run')
+    def test_compile_writes_unique_temp_files(self, run):
+        run.return_value = Mock(returncode=0)
+        self.device._compiled_applescript('return 1')
+        self.device._compiled_applescript('return 1')
+        os.remove(self.device._compiled_applescript('return 1'))
+        self.device._compiled_applescript('return 1')
+        self.device._compiled_applescript('return 1')
+
+        temp_paths = [call.args[0][2] for call in run.call_args_list]
+        self.assertEqual(len(temp_paths), 2)
+        self.assertNotEqual(temp_paths[0], temp_paths[1])
+
+    @patch('src.mac.subprocess.run')
+    def test_failed_compile_leaves_no_temp_file(self, run):
+        run.return_value = Mock(returncode=1)
+        self.device._compiled_applescript('syntax error')
+        self.assertIsNone(self.device._compiled_applescript('syntax error'))
+        self.assertEqual(os.listdir(self.cache_dir.name), [])
+
+
+if __name__ == '__main__':
+    unittest.main()